@@ -15,6 +15,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import ast
+import concurrent.futures
 import getopt
 import glob
 import pickle
@@ -27,6 +29,11 @@ import numpy
 
 from advise import check, postprocess
 from advise import compare_sets
+from advise import export
+from advise import fleetstore
+from advise import regroup
+from advise import ingest
+from advise import perftable
 from advise import utils
 
 from advise.visualise import Visualiser
@@ -55,6 +62,23 @@ def print_help():
                                         coma separated list of components :
                                         cpu, hpa, disk, firmware, memory,
                                         network, system, megaraid, ahci, ipmi
+-f <file>  or --fleet <file>        : Load all the systems from a fleet file
+                                        written by m2-extract --fleet instead
+                                        of using a pattern
+-j <jobs>  or --jobs <jobs>         : Number of worker processes used to
+                                        parse the input files and to
+                                        analyse the performance of the
+                                        groups (default: 1)
+--columnar                          : Also write the metrics of
+                                        results/results.jsonl to
+                                        results/metrics.npz
+--eager                             : Write the differences of every pair of
+                                        groups in results/Paired_Comparisons
+                                        instead of comparing them on demand
+                                        with advise-compare
+--archive                           : Write the differences of every pair of
+                                        groups in the single indexed file
+                                        results/Paired_Comparisons.zip
 -r <dir1>[,<dir2>,<dir3>, ...]      : Perform the rampup analysis on directory
                                         containing results from dahc.
                                         In such mode, no need to provide
@@ -69,97 +93,200 @@ $ advise.py -p 'sample/*.hw' -l DETAIL -g '1' -c 'standalone_rand.*_4k_IOps' \
     -i 'sd.*'
 $ advise.py -p 'sample/*.hw' -l DETAIL -g '0' -c '1G' -i '.*'
 $ advise.py -p '*hw' -I disk,cpu -o plop
+$ advise.py -f extra-hardware.fleet -o plop
 $ advise.py -r '/var/lib/edeploy/health/dahc/cpu_load/2014_09_15-12h17'
 ''')
 
 
-def compare_disks(bench_values, unique_id, systems_groups):
+def compare_disks(bench_values, unique_id, partition):
     systems = utils.find_sub_element(bench_values, unique_id, 'pdisk')
     groups = check.physical_megaraid_disks(systems, unique_id)
-    compare_sets.compute_similar_hosts_list(
-        systems_groups,
-        compare_sets.get_hosts_list_from_result(groups))
+    partition.refine(groups.values())
     systems = utils.find_sub_element(bench_values, unique_id, 'disk')
     groups = check.physical_hpa_disks(systems, unique_id)
-    compare_sets.compute_similar_hosts_list(
-        systems_groups,
-        compare_sets.get_hosts_list_from_result(groups))
+    partition.refine(groups.values())
     groups = check.logical_disks(systems, unique_id)
-    compare_sets.compute_similar_hosts_list(
-        systems_groups,
-        compare_sets.get_hosts_list_from_result(groups))
+    partition.refine(groups.values())
 
 
 def compare_type(type_, check_func, title, global_params,
-                 bench_values, unique_id, systems_groups,
+                 bench_values, unique_id, partition,
                  names_dict):
     systems = utils.find_sub_element(bench_values, unique_id, type_)
     groups = check_func(systems, unique_id)
-    compare_sets.compute_similar_hosts_list(
-        systems_groups,
-        compare_sets.get_hosts_list_from_result(groups))
+    partition.refine(groups.values())
     compare_sets.print_groups(global_params, groups, title)
     vis.add_result(title, groups)
     postprocess.process_groups(groups, title, global_params, names_dict)
 
 
-def group_systems(global_params, bench_values, unique_id,
-                  systems_groups, ignore_list, names_dict):
-    for name, func, title in (
-            ('hpa', check.hpa, "HPA Controller"),
-            ('disk', check.physical_hpa_disks, "HPA Disks"),
-            ('megaraid', check.megaraid, "Megaraid Controller"),
-            ('disk', check.logical_disks, "Megaraid Disks"),
-            ('ahci', check.ahci, "AHCI Controller"),
-            ('ipmi', check.ipmi, "IPMI SDR"),
-            ('system', check.systems, "System"),
-            ('firmware', check.firmware, "Firmware"),
-            ('memory', check.memory_timing, "DDR Timing"),
-            ('network', check.network_interfaces,
-             "Network Interfaces"),
-            ('cpu', check.cpu, "Processors")):
-        if name not in ignore_list:
-            compare_type(name, func, title, global_params, bench_values,
-                         unique_id, systems_groups, names_dict)
+# Hardware checks grouping the systems, a check is skipped when its item
+# is in the ignore list
+HARDWARE_CHECKS = (
+    (check.HPA_CHECK, "HPA Controller"),
+    (check.HPA_DISKS_CHECK, "HPA Disks"),
+    (check.MEGARAID_CHECK, "Megaraid Controller"),
+    (check.LOGICAL_DISKS_CHECK, "Megaraid Disks"),
+    (check.AHCI_CHECK, "AHCI Controller"),
+    (check.IPMI_CHECK, "IPMI SDR"),
+    (check.SYSTEMS_CHECK, "System"),
+    (check.FIRMWARE_CHECK, "Firmware"),
+    (check.MEMORY_TIMING_CHECK, "DDR Timing"),
+    (check.NETWORK_INTERFACES_CHECK, "Network Interfaces"),
+    (check.CPU_CHECK, "Processors"))
 
 
-def compare_performance(bench_values, unique_id, systems_groups, detail,
-                        global_params, names_dict, rampup_value=0,
-                        current_dir=""):
-    for group in systems_groups:
-        systems = utils.find_sub_element(bench_values, unique_id,
-                                         'disk', group)
-        check.logical_disks_perf(systems, unique_id,
-                                 systems_groups.index(group),
+def group_systems(global_params, bench_values, unique_id,
+                  partition, ignore_list, names_dict):
+    # Ignored checks are still run, so their fingerprints are saved and
+    # advise-regroup can try other ignore lists
+    results = check.hardware_signatures(bench_values, unique_id,
+                                        [rule for rule, _ in HARDWARE_CHECKS])
+    if "output_dir" in global_params.keys():
+        regroup.save(regroup.fingerprints_path(global_params["output_dir"]),
+                     unique_id, list(partition.blocks),
+                     [(rule[0], title) for rule, title in HARDWARE_CHECKS],
+                     results, names_dict)
+    # Systems are identical when they have the same fingerprint for every
+    # check
+    signatures = {}
+    for (rule, title), groups in zip(HARDWARE_CHECKS, results):
+        if rule[0] in ignore_list:
+            continue
+        for fingerprint, names in groups.items():
+            for name in names:
+                signatures.setdefault(name, []).append(fingerprint)
+        compare_sets.print_groups(global_params, groups, title)
+        for record in export.fingerprint_records(title, rule[0], groups):
+            utils.reporter.record(record)
+        vis.add_result(title, groups)
+        postprocess.process_groups(groups, title, global_params, names_dict,
+                                   rule[0])
+    combined = {}
+    for name, fingerprints in signatures.items():
+        combined.setdefault(tuple(fingerprints), []).append(name)
+    partition.refine(combined.values())
+
+
+# Performance checks run for each group, in order
+PERF_FAMILIES = ('disk', 'cpu', 'memory', 'network')
+
+
+def group_performance(perf_table, family, group, group_number, detail,
+                      global_params, names_dict, vis, rampup_value=0,
+                      current_dir=""):
+    if family == 'disk':
+        check.logical_disks_perf(perf_table, group, group_number,
                                  detail, global_params, names_dict, vis,
                                  "KBps", rampup_value, current_dir)
-        check.logical_disks_perf(systems, unique_id,
-                                 systems_groups.index(group),
+        check.logical_disks_perf(perf_table, group, group_number,
                                  detail, global_params, names_dict, vis,
                                  "IOps", rampup_value, current_dir)
-
-    for group in systems_groups:
-        systems = utils.find_sub_element(bench_values, unique_id, 'cpu', group)
-        check.cpu_perf(systems, unique_id, systems_groups.index(group), detail,
+    elif family == 'cpu':
+        check.cpu_perf(perf_table, group, group_number, detail,
                        global_params, names_dict, vis, rampup_value,
                        current_dir)
-
-    for group in systems_groups:
-        systems = utils.find_sub_element(bench_values, unique_id, 'cpu', group)
-        check.memory_perf(systems, unique_id, systems_groups.index(group),
+    elif family == 'memory':
+        check.memory_perf(perf_table, group, group_number,
                           detail, global_params, names_dict, vis, rampup_value,
                           current_dir)
-
-    for group in systems_groups:
-        systems = utils.find_sub_element(bench_values, unique_id, 'network',
-                                         group)
-        check.network_perf(systems, unique_id, systems_groups.index(group),
+    elif family == 'network':
+        check.network_perf(perf_table, group, group_number,
                            detail, global_params, names_dict, vis,
                            rampup_value, current_dir)
 
 
-def analyze_data(global_params, pattern, ignore_list, detail, rampup_value=0,
-                 max_rampup_value=0, current_dir=""):
+class VisRecorder:
+    """Record the Visualiser calls of a worker, to replay them later"""
+
+    def __init__(self):
+        self.calls = []
+
+    def add_item_varperf(self, *args):
+        self.calls.append(('add_item_varperf', args))
+
+    def add_item_overperf(self, *args):
+        self.calls.append(('add_item_overperf', args))
+
+    def add_item_underperf(self, *args):
+        self.calls.append(('add_item_underperf', args))
+
+    def replay(self, vis):
+        for name, args in self.calls:
+            getattr(vis, name)(*args)
+
+
+# State shared by the performance workers
+perf_worker = {}
+
+
+def init_perf_worker(perf_table, detail, global_params, names_dict,
+                     print_level, console):
+    utils.PRINTLEVEL = print_level
+    # Workers report to their own reporter, the parent merges the
+    # messages of the tasks in order
+    utils.reporter = utils.Reporter()
+    utils.reporter.console = console
+    perf_worker.update(perf_table=perf_table, detail=detail,
+                       global_params=global_params, names_dict=names_dict)
+
+
+def run_perf_task(task):
+    family, group, group_number = task
+    recorder = VisRecorder()
+    group_performance(perf_worker["perf_table"], family, group,
+                      group_number, perf_worker["detail"],
+                      perf_worker["global_params"],
+                      perf_worker["names_dict"], recorder)
+    return utils.reporter.take(), recorder
+
+
+def compare_performance(bench_values, unique_id, systems_groups, detail,
+                        global_params, names_dict, rampup_value=0,
+                        current_dir=""):
+    # The benchmark results are extracted once for all the groups
+    perf_table = perftable.PerfTable(bench_values, unique_id)
+    tasks = [(family, group, systems_groups.index(group))
+             for family in PERF_FAMILIES for group in systems_groups]
+
+    # The rampup mode updates plot files shared by all the groups, it is
+    # always run serially
+    jobs = global_params.get("jobs", 1)
+    if jobs == 1 or len(tasks) < 2 or rampup_value > 0:
+        for family, group, group_number in tasks:
+            group_performance(perf_table, family, group, group_number,
+                              detail, global_params, names_dict, vis,
+                              rampup_value, current_dir)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=init_perf_worker,
+            initargs=(perf_table, detail, global_params, names_dict,
+                      utils.PRINTLEVEL, utils.reporter.console)) as executor:
+        for messages, recorder in executor.map(run_perf_task, tasks):
+            utils.reporter.extend(messages)
+            recorder.replay(vis)
+
+
+def report_parse_times(global_params, parse_times, rampup_value=0,
+                       slowest=5):
+    parse_times = sorted(parse_times, reverse=True)
+    utils.do_print("parse_times", utils.Levels.DETAIL,
+                   "%d files parsed, %.2f s spent parsing",
+                   len(parse_times), sum(t for t, _ in parse_times))
+    for parse_time, health in parse_times[:slowest]:
+        utils.do_print("parse_times", utils.Levels.DETAIL, "%10.2f ms : %s",
+                       parse_time * 1000, health)
+    # Each rampup step would overwrite the file of the previous one
+    if global_params.get("output_dir") and rampup_value == 0:
+        with open("%s/results/_parse_times" % global_params["output_dir"],
+                  "w") as f:
+            for parse_time, health in parse_times:
+                print("%10.2f ms : %s" % (parse_time * 1000, health), file=f)
+
+
+def load_health_files(global_params, pattern, rampup_value=0,
+                      max_rampup_value=0):
     if rampup_value > 0:
         pattern = pattern + "*.hw"
 
@@ -188,22 +315,52 @@ def analyze_data(global_params, pattern, ignore_list, detail, rampup_value=0,
 
     # Extract data from the hw files
     bench_values = []
-    for health in health_data_file:
-        bench_values.append(eval(open(health).read()))
+    parse_times = []
+    loaded = ingest.load_files(health_data_file, global_params.get("jobs", 1))
+    for health, (bench, parse_time) in zip(health_data_file, loaded):
+        bench_values.append(bench)
+        parse_times.append((parse_time, health))
+    report_parse_times(global_params, parse_times, rampup_value)
+
+    return utils.find_names(path, pattern), bench_values
+
+
+def load_fleet(fleet):
+    if not os.path.isfile(fleet):
+        print("Error: the fleet file %s doesn't exists !" % fleet)
+        sys.exit(2)
+    names, bench_values = fleetstore.load(fleet)
+    if not bench_values:
+        print("No node found in fleet file %s!" % fleet)
+        sys.exit(1)
+    print("### %d nodes loaded from fleet file '%s' ###" %
+          (len(bench_values), fleet))
+    return names, bench_values
+
+
+def analyze_data(global_params, pattern, ignore_list, detail, rampup_value=0,
+                 max_rampup_value=0, current_dir=""):
+    if "fleet" in global_params.keys() and rampup_value == 0:
+        names, bench_values = load_fleet(global_params["fleet"])
+    else:
+        names, bench_values = load_health_files(global_params, pattern,
+                                                rampup_value,
+                                                max_rampup_value)
 
     if rampup_value > 0:
         unique_id = 'uuid'
     else:
         unique_id = 'serial'
 
-    names = utils.find_names(path, pattern)
+    # Index the lines of each system by category once, every lookup
+    # done while grouping or comparing performance uses it
+    fleet_index = utils.FleetIndex(bench_values)
 
     # Extracting the host list from the data to get
     # the initial list of hosts. We have here a single group
     # with all the servers
-    systems_groups = []
-    hosts_list = utils.get_hosts_list(bench_values, unique_id)
-    systems_groups.append(set(hosts_list))
+    hosts_list = utils.get_hosts_list(fleet_index, unique_id)
+    partition = compare_sets.Partition(hosts_list)
 
     names_dict = dict(zip(hosts_list, names))
 
@@ -214,53 +371,64 @@ def analyze_data(global_params, pattern, ignore_list, detail, rampup_value=0,
     vis = Visualiser(output_dir)
     vis.names_dict = names_dict
 
+    report = utils.reporter
+    report.output_dir = output_dir
+    report.truncate(utils.RESULTS)
+    if (output_dir and global_params.get("archive") and
+            os.path.exists(postprocess.archive_path(output_dir))):
+        os.remove(postprocess.archive_path(output_dir))
+
     # Let's create groups of similar servers
     if rampup_value == 0:
-        group_systems(global_params, bench_values, unique_id, systems_groups,
+        group_systems(global_params, fleet_index, unique_id, partition,
                       ignore_list, names_dict)
+    systems_groups = partition.groups()
+    if rampup_value == 0:
         compare_sets.print_systems_groups(systems_groups, global_params, vis)
+    positions = dict((host, position) for position, host
+                     in reversed(list(enumerate(hosts_list))))
+    for group in systems_groups:
+        report.record(export.group_record(
+            systems_groups.index(group), sorted(group, key=positions.get),
+            names_dict))
+    report.flush()
 
     # It's time to compare performance in each group
 
     if ("output_dir" in global_params.keys()):
-        with open("%s/results/_performance" % global_params["output_dir"],
-                  "w") as f:
-            orig_stdout = sys.stdout
-            sys.stdout = f
-
-            total_hosts = 0
-            for system in systems_groups:
-                total_hosts += len(system)
-            print("The %d systems can be grouped in %d groups of "
-                  "identical hardware" % (total_hosts, len(systems_groups)))
-            for system in systems_groups:
-                print("Group %d (%d Systems)" % (
-                    systems_groups.index(system), len(system)))
-                print("-> " + ', '.join(system))
-                print()
-
-            with open("%s/results/_perf_summary" % global_params["output_dir"],
-                      "a") as f2:
-                print("The %d systems can be grouped in %d groups of "
-                      "identical hardware" % (total_hosts,
-                                              len(systems_groups)), file=f2)
-                for system in systems_groups:
-                    print("Group %d (%d Systems)" % (
-                        systems_groups.index(system), len(system)), file=f2)
-                    print("-> " + ', '.join(system), file=f2)
-                    print(file=f2)
-
-            compare_performance(bench_values, unique_id, systems_groups,
-                                detail, global_params, names_dict,
-                                rampup_value, current_dir)
-            sys.stdout = orig_stdout
-    else:
-        compare_performance(bench_values, unique_id, systems_groups, detail,
-                            global_params, names_dict, rampup_value,
-                            current_dir)
-    print("##########################################")
-    print()
-    vis.save_data()
+        report.truncate(utils.PERFORMANCE)
+        channels = (utils.PERFORMANCE, utils.PERF_SUMMARY)
+
+        total_hosts = 0
+        for system in systems_groups:
+            total_hosts += len(system)
+        report.print("The %d systems can be grouped in %d groups of "
+                     "identical hardware" % (total_hosts,
+                                             len(systems_groups)),
+                     channels=channels)
+        for system in systems_groups:
+            report.print("Group %d (%d Systems)" % (
+                systems_groups.index(system), len(system)),
+                channels=channels)
+            report.print("-> " + ', '.join(system), channels=channels)
+            report.print(channels=channels)
+
+        # The console messages of the performance checks make the
+        # performance report
+        report.console = utils.PERFORMANCE
+    compare_performance(fleet_index, unique_id, systems_groups, detail,
+                        global_params, names_dict, rampup_value,
+                        current_dir)
+    report.console = utils.CONSOLE
+    report.print("##########################################")
+    report.print()
+    report.flush()
+    if "columnar" in global_params.keys() and output_dir:
+        export.write_columnar("%s/results/%s" % (output_dir, utils.RESULTS),
+                              "%s/results/metrics.npz" % output_dir)
+    if output_dir:
+        vis.save_figures()
+        vis.save_data()
 
     return bench_values
 
@@ -527,9 +695,11 @@ def main():
     detail = {'category': '', 'group': '', 'item': ''}
     global_params = {}
     try:
-        opts, _ = getopt.getopt(sys.argv[1:], "hp:l:g:c:i:I:r:o:",
+        opts, _ = getopt.getopt(sys.argv[1:], "hp:l:g:c:i:I:r:o:j:f:",
                                 ['pattern', 'log-level', 'group', 'category',
-                                 'item', "ignore", "rampup", "output_dir"])
+                                 'item', "ignore", "rampup", "output_dir",
+                                 "jobs=", "fleet=", "columnar", "eager",
+                                 "archive"])
     except getopt.GetoptError:
         print("Error: One of the options passed "
               "to the cmdline was not supported")
@@ -585,6 +755,22 @@ def main():
             else:
                 os.mkdir(arg)
             global_params["output_dir"] = arg
+        elif opt in ("-f", "--fleet"):
+            global_params["fleet"] = arg
+        elif opt == "--columnar":
+            global_params["columnar"] = True
+        elif opt == "--eager":
+            global_params["eager"] = True
+        elif opt == "--archive":
+            global_params["archive"] = True
+        elif opt in ("-j", "--jobs"):
+            try:
+                global_params["jobs"] = int(arg)
+            except ValueError:
+                global_params["jobs"] = 0
+            if global_params["jobs"] < 1:
+                print("Error: the number of jobs shall be a positive integer")
+                sys.exit(2)
 
     if (utils.print_level & utils.Levels.DETAIL) == utils.Levels.DETAIL:
         if not detail['group'] or not detail['category'] or not detail['item']:
@@ -592,8 +778,8 @@ def main():
                   "options to be set")
             sys.exit(2)
 
-    if not pattern and not rampup:
-        print("Error: Pattern option is mandatory")
+    if not pattern and not rampup and "fleet" not in global_params.keys():
+        print("Error: Pattern or fleet option is mandatory")
         print_help()
         sys.exit(2)
 
@@ -670,7 +856,8 @@ def main():
                               (rampup_value, metrics_file))
                         print("Skipping %d" % rampup_value)
                         continue
-                    metrics = eval(open(metrics_file).read())
+                    with open(metrics_file) as f:
+                        metrics = ast.literal_eval(f.read())
                     titles[rampup_dir] = metrics["bench"]["title"]
                     compute_metrics(current_dir, rampup_value, metrics)
 
@@ -15,107 +15,210 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
 import re
-import sys
 
 import numpy
+from pandas import concat
 from pandas import DataFrame
 from pandas import Series
 
 from advise import compare_sets
+from advise import export
 from advise import perf_cpu_tables
+from advise import perftable
 from advise import utils
 
 
+# Messages of the performance checks also go to the perf summary
+PERF_CHANNELS = (utils.CONSOLE, utils.PERF_SUMMARY)
+
+
+def _substring_matcher(substrings):
+    # A single regexp finding any of the substrings
+    if not substrings:
+        return None
+    return re.compile("|".join(re.escape(substring)
+                               for substring in substrings)).search
+
+
+class Rule:
+    """A search_item selection compiled once
+
+    Tuples are selected when their sub element matches ``regexp`` and their
+    key passes the include/exclude/override lists. Both decisions only
+    depend on one string, so they are memoized and each distinct sub element
+    or key of the fleet is only evaluated once.
+    """
+
+    def __init__(self, regexp, exclude_list=(), include_list=(),
+                 override_list=()):
+        self.regexp = re.compile(regexp)
+        self.exclude = _substring_matcher(exclude_list)
+        self.include = _substring_matcher(include_list)
+        self.override = _substring_matcher(override_list)
+        self._subs = {}
+        self._keys = {}
+
+    def accept_sub(self, sub):
+        accepted = self._subs.get(sub)
+        if accepted is None:
+            accepted = self.regexp.match(sub) is not None
+            self._subs[sub] = accepted
+        return accepted
+
+    def accept_key(self, key):
+        accepted = self._keys.get(key)
+        if accepted is None:
+            # If we have an include_list, only those shall be used
+            # So everything is exclude by default
+            excluded = (self.include is not None and
+                        self.include(key) is None)
+            if self.exclude is not None and self.exclude(key) is not None:
+                excluded = True
+            accepted = (not excluded or (self.override is not None and
+                                         self.override(key) is not None))
+            self._keys[key] = accepted
+        return accepted
+
+    def accepts(self, stuff):
+        return self.accept_sub(stuff[1]) and self.accept_key(stuff[2])
+
+    def select(self, lines):
+        subs = self._subs
+        keys = self._keys
+        selected = set()
+        for stuff in lines:
+            accepted = subs.get(stuff[1])
+            if accepted is None:
+                accepted = self.accept_sub(stuff[1])
+            if not accepted:
+                continue
+            accepted = keys.get(stuff[2])
+            if accepted is None:
+                accepted = self.accept_key(stuff[2])
+            if accepted:
+                selected.add(tuple(stuff))
+        return selected
+
+    def search(self, system_list, unique_id, item):
+        sets = {}
+        for system in system_list:
+            sets[system[unique_id]] = self.select(system[item])
+        return sets
+
+
+@functools.lru_cache(maxsize=None)
+def compile_rule(regexp, exclude_list=(), include_list=(), override_list=()):
+    return Rule(regexp, exclude_list, include_list, override_list)
+
+
 def search_item(system_list, unique_id, item, regexp, exclude_list=[],
                 include_list=[], override_list=[]):
-    sets = {}
-    for system in system_list:
-        sets[system[unique_id]] = set()
-        current_set = sets[system[unique_id]]
-        for stuff in system[item]:
-            match = re.match(regexp, stuff[1])
-            if match:
-                shall_be_added = False
-
-                # If we have an include_list, only those shall be used
-                # So everything is exclude by default
-                if include_list:
-                    shall_be_excluded = True
-                else:
-                    shall_be_excluded = False
-
-                for include in include_list:
-                    if include in stuff[2]:
-                        # If something is part of the include list
-                        # It is no more excluded
-                        shall_be_excluded = False
-
-                for exclude in exclude_list:
-                    if exclude in stuff[2]:
-                        shall_be_excluded = True
-
-                for override in override_list:
-                    if override in stuff[2]:
-                        shall_be_added = True
-
-                if (shall_be_excluded is False) or (shall_be_added is True):
-                    current_set.add(tuple(stuff))
-    return sets
+    rule = compile_rule(regexp, tuple(exclude_list), tuple(include_list),
+                        tuple(override_list))
+    return rule.search(system_list, unique_id, item)
+
+
+# Rules of the hardware checks, as given to search_item():
+# (item, regexp, exclude_list, include_list, override_list)
+HPA_CHECK = ("hpa", "(.*)", ['cache_serial_number', 'serial_number'])
+HPA_DISKS_CHECK = ("disk", r"(\d+)I:(\d+):(\d+)",
+                   ['current_temperature_(c)', 'maximum_temperature_(c)',
+                    'serial_number'])
+MEGARAID_CHECK = ("megaraid", "(.*)",
+                  ['SerialNo', 'SasAddress', 'ControllerTemperature',
+                   'VendorSpecific', 'RocTemperature'])
+MEGARAID_DISKS_CHECK = ("pdisk", r"disk(\d+)",
+                        ['Wwn', 'SasAddress', 'DriveTemperature',
+                         'InquiryData[2]', 'DeviceId'])
+LOGICAL_DISKS_CHECK = ("disk", r"[a-z]d(\S+)|nvme.*|logical",
+                       ['simultaneous', 'standalone', 'id', 'serial_number',
+                        'SMART/'], [],
+                       ['when_failed', 'vendor', 'product', 'health'])
+AHCI_CHECK = ("ahci", r".*")
+IPMI_CHECK = ("ipmi", "(?!(.*Temp$|.*RPM$)).*", ['mac-address', 'ip-address'])
+SYSTEMS_CHECK = ("system", "(.*)", ['serial', 'uuid'])
+FIRMWARE_CHECK = ("firmware", "(.*)")
+MEMORY_TIMING_CHECK = ("memory", "DDR(.*)")
+MEMORY_BANKS_CHECK = ("memory", "bank(.*)", ['serial'])
+NETWORK_INTERFACES_CHECK = ("network", "(.*)", ['serial', 'ipv4'])
+CPU_CHECK = ("cpu", "(.*)", ['bogomips', 'loops_per_sec', 'bandwidth',
+                             'cache_size', '/temperature'])
+
+
+def hardware_signatures(bench_values, unique_id, checks):
+    """Run several hardware checks in a single pass over each system
+
+    The lines of a system are only handed to the checks whose item matches
+    their category, the same way find_sub_element() selects them.
+
+    Args:
+      bench_values: utils.FleetIndex or list of systems
+      unique_id (str): key identifying the systems
+      checks: list of rules, like HPA_CHECK
+
+    Returns:
+      for each check, the same {Fingerprint: [names]} dict as the check
+      functions
+    """
+    if not isinstance(bench_values, utils.FleetIndex):
+        bench_values = utils.FleetIndex(bench_values)
+    rules = [(check[0], compile_rule(check[1], *(tuple(items) for items
+                                                 in check[2:])))
+             for check in checks]
+    ids, _ = bench_values.ids(unique_id)
+    applicable = {}
+    sets = [{} for _ in rules]
+    for system, lines in enumerate(bench_values.lines):
+        selected = [set() for _ in rules]
+        for category, category_lines in lines.items():
+            if category not in applicable:
+                applicable[category] = [(number, rule) for number, (item, rule)
+                                        in enumerate(rules)
+                                        if item in category]
+            for number, rule in applicable[category]:
+                selected[number].update(rule.select(category_lines))
+        name = ids[system][-1] if ids[system] else ''
+        for number, components in enumerate(selected):
+            sets[number][name] = components
+    return [compare_sets.compare(check_sets) for check_sets in sets]
 
 
 def physical_hpa_disks(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "disk", r"(\d+)I:(\d+):(\d+)",
-                       ['current_temperature_(c)',
-                        'maximum_temperature_(c)',
-                        'serial_number'])
+    sets = search_item(system_list, unique_id, *HPA_DISKS_CHECK)
     return compare_sets.compare(sets)
 
 
 def physical_megaraid_disks(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "pdisk", r"disk(\d+)",
-                       ['Wwn', 'SasAddress', 'DriveTemperature',
-                        'InquiryData[2]', 'DeviceId'])
+    sets = search_item(system_list, unique_id, *MEGARAID_DISKS_CHECK)
     return compare_sets.compare(sets)
 
 
 def logical_disks(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "disk", r"[a-z]d(\S+)|nvme.*|logical",
-                       ['simultaneous', 'standalone', 'id', 'serial_number',
-                        'SMART/'], [],
-                       ['when_failed', 'vendor', 'product', 'health'])
+    sets = search_item(system_list, unique_id, *LOGICAL_DISKS_CHECK)
     return compare_sets.compare(sets)
 
 
 def ahci(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "ahci", r".*")
+    sets = search_item(system_list, unique_id, *AHCI_CHECK)
     return compare_sets.compare(sets)
 
 
 def ipmi(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "ipmi",
-                       "(?!(.*Temp$|.*RPM$)).*",
-                       ['mac-address', 'ip-address'])
+    sets = search_item(system_list, unique_id, *IPMI_CHECK)
     return compare_sets.compare(sets)
 
 
-def compute_deviance_percentage(item, df):
-    # If we have a single item
-    # checking the variance is useless
-    if df[item].count() == 1:
-        return 0
-    return df[item].std() / df[item].mean() * 100
-
-
 def print_detail(detail_options, details, df, matched_category):
     if (utils.PRINTLEVEL & utils.Levels.DETAIL) != utils.Levels.DETAIL:
         return
     if df.loc[details]:
-        print()
-        print("%-34s: %-8s: %s" % (matched_category[0],
-                                   utils.Levels.message[utils.PRINTLEVEL],
-                                   detail_options['item']))
-        print(df.loc[details])
+        utils.reporter.print()
+        utils.reporter.print("%-34s: %-8s: %s" % (
+            matched_category[0], utils.Levels.message[utils.PRINTLEVEL],
+            detail_options['item']))
+        utils.reporter.print(df.loc[details])
 
 
 def prepare_detail(detail_options, group_number, category, item, details,
@@ -153,46 +256,33 @@ def prepare_detail(detail_options, group_number, category, item, details,
     return ""
 
 
-def network_perf(system_list, unique_id, group_number, detail_options,
+def network_perf(perf_table, hosts, group_number, detail_options,
                  global_params, names_dict, vis, rampup_value=0,
                  current_dir=""):
     have_net_data = False
     modes = ['bandwidth', 'requests_per_sec']
-    sets = search_item(system_list, unique_id, "network", r"(.*)", [], modes)
+    columns, rows = perf_table.rows(hosts, "network")
+    rows = rows[rows['metric'].str.contains("|".join(modes))]
     for mode in sorted(modes):
-        results = {}
-        for system in sets:
-            # ignore empty sets, e.g sets = {'CZ3222KDMF': set([])}
-            if not sets[system]:
-                continue
-            net = []
-            series = []
-            global_perf = 0.0
-            for perf in sets[system]:
-                if perf[1] == mode:
-                    if not perf[1] in net:
-                        net.append(perf[1])
-                    global_perf = global_perf + float(perf[3])
-
-            series.append(global_perf)
-            results[system] = Series(series, dtype='float64', index=net)
+        # The performance of a host is the sum of its results
+        perf = rows[rows['device'] == mode].groupby('host', sort=False)
+        perf = perf['value'].sum()
+        systems = [system for system in columns if system in perf.index]
 
         # No need to continue if no network drive data in this benchmark
-        if not results:
+        if not systems:
             continue
 
-        df = DataFrame(results)
+        df = DataFrame([perf[systems].to_numpy()], dtype='float64',
+                       index=[mode], columns=systems)
         details = []
         matched_category = []
-        for net in df.transpose().columns:
+        stats = group_stats(df, mode)
+        for net in df.index:
             if have_net_data is False:
-                print()
-                print("Group %d : Checking network disks perf" % group_number)
-                with open("%s/results/_perf_summary"
-                          % global_params["output_dir"], "a") as f:
-                    print(file=f)
-                    print("Group %d : Checking network disks perf" %
-                          group_number, file=f)
+                utils.reporter.print(channels=PERF_CHANNELS)
+                utils.reporter.print("Group %d : Checking network disks perf" %
+                                     group_number, channels=PERF_CHANNELS)
                 have_net_data = True
             consistent = []
             curious = []
@@ -201,10 +291,10 @@ def network_perf(system_list, unique_id, group_number, detail_options,
             tolerance_max = 15
             tolerance_min = 2
 
-            print_perf(tolerance_min, tolerance_max, df.transpose()[net], df,
+            print_perf(tolerance_min, tolerance_max, df.loc[net], df,
                        mode, net, global_params, names_dict, vis, group_number,
                        consistent, curious, unstable, "", rampup_value,
-                       current_dir)
+                       current_dir, stats)
             if mode == 'bandwidth':
                 unit = "MB/sec"
             else:
@@ -221,44 +311,29 @@ def network_perf(system_list, unique_id, group_number, detail_options,
         print_detail(detail_options, details, df, matched_category)
 
 
-def logical_disks_perf(system_list, unique_id, group_number, detail_options,
+def logical_disks_perf(perf_table, hosts, group_number, detail_options,
                        global_params, names_dict, vis, perf_unit,
                        rampup_value=0, current_dir=""):
     have_disk_data = False
-    sets = search_item(system_list, unique_id, "disk", r"[a-z]d(\S+)|nvme.*|logical", [],
-                       ['simultaneous', 'standalone'])
-    modes = []
+    columns, rows = perf_table.rows(hosts, "disk")
+    rows = rows[rows['device'].str.match(r"[a-z]d(\S+)|nvme.*|logical") &
+                rows['metric'].str.contains("simultaneous|standalone")]
 
     # Searching for modes ran in this benchmark
-    for system in sets:
-        for perf in sets[system]:
-            if perf[2] not in modes and perf_unit in perf[2]:
-                modes.append(perf[2])
+    modes = [mode for mode in rows['metric'].unique() if perf_unit in mode]
 
     for mode in sorted(modes):
-        results = {}
-        for system in sets:
-            disks = []
-            series = []
-            for perf in sets[system]:
-                if perf[2] == mode:
-                    if not perf[1] in disks:
-                        disks.append(perf[1])
-                    series.append(int(round(float(perf[3]))))
-            results[system] = Series(series, dtype='float64', index=disks)
-
-        df = DataFrame(results)
+        mode_rows = rows[rows['metric'] == mode]
+        df = perftable.pivot(mode_rows, columns,
+                             mode_rows['value'].round())
         details = []
         matched_category = []
-        for disk in df.transpose().columns:
+        stats = group_stats(df, mode)
+        for disk in df.index:
             if have_disk_data is False:
-                print()
-                print("Group %d : Checking logical disks perf" % group_number)
-                with open("%s/results/_perf_summary"
-                          % global_params["output_dir"], "a") as f:
-                    print(file=f)
-                    print("Group %d : Checking logical disks perf" %
-                          group_number, file=f)
+                utils.reporter.print(channels=PERF_CHANNELS)
+                utils.reporter.print("Group %d : Checking logical disks perf" %
+                                     group_number, channels=PERF_CHANNELS)
                 have_disk_data = True
             consistent = []
             curious = []
@@ -272,10 +347,10 @@ def logical_disks_perf(system_list, unique_id, group_number, detail_options,
                 tolerance_min = 5
                 tolerance_max = 15
 
-            print_perf(tolerance_min, tolerance_max, df.transpose()[disk], df,
+            print_perf(tolerance_min, tolerance_max, df.loc[disk], df,
                        mode, disk, global_params, names_dict, vis,
                        group_number, consistent, curious, unstable,
-                       "-%s" % perf_unit, rampup_value, current_dir)
+                       "-%s" % perf_unit, rampup_value, current_dir, stats)
 
             prepare_detail(detail_options, group_number, mode, disk, details,
                            matched_category)
@@ -290,74 +365,97 @@ def logical_disks_perf(system_list, unique_id, group_number, detail_options,
 
 
 def hpa(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "hpa", "(.*)",
-                       ['cache_serial_number', 'serial_number'])
+    sets = search_item(system_list, unique_id, *HPA_CHECK)
     return compare_sets.compare(sets)
 
 
 def megaraid(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "megaraid", "(.*)",
-                       ['SerialNo', 'SasAddress', 'ControllerTemperature',
-                        'VendorSpecific', 'RocTemperature'])
+    sets = search_item(system_list, unique_id, *MEGARAID_CHECK)
     return compare_sets.compare(sets)
 
 
 def systems(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "system", "(.*)",
-                       ['serial', 'uuid'])
+    sets = search_item(system_list, unique_id, *SYSTEMS_CHECK)
     return compare_sets.compare(sets)
 
 
 def firmware(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "firmware", "(.*)")
+    sets = search_item(system_list, unique_id, *FIRMWARE_CHECK)
     return compare_sets.compare(sets)
 
 
 def memory_timing(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "memory", "DDR(.*)")
+    sets = search_item(system_list, unique_id, *MEMORY_TIMING_CHECK)
     return compare_sets.compare(sets)
 
 
 def memory_banks(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "memory", "bank(.*)",
-                       ['serial'])
+    sets = search_item(system_list, unique_id, *MEMORY_BANKS_CHECK)
     return compare_sets.compare(sets)
 
 
 def network_interfaces(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "network", "(.*)",
-                       ['serial', 'ipv4'])
+    sets = search_item(system_list, unique_id, *NETWORK_INTERFACES_CHECK)
     return compare_sets.compare(sets)
 
 
 def cpu(system_list, unique_id):
-    sets = search_item(system_list, unique_id, "cpu", "(.*)",
-                       ['bogomips', 'loops_per_sec', 'bandwidth',
-                        'cache_size', '/temperature'])
+    sets = search_item(system_list, unique_id, *CPU_CHECK)
     return compare_sets.compare(sets)
 
 
+def group_stats(df, mode):
+    """Statistics of every item of a group, computed at once
+
+    Args:
+      df (DataFrame): one row per item, one column per host
+      mode (str): benchmark mode, hosts are compared on their value of the
+                  item for loops_per_sec and bogomips, on the mean of all
+                  their items otherwise
+
+    Returns:
+      dict of Series indexed by item: std, mean, sum, min, max and deviance
+      (std in percent of the mean), plus the host values compared with the
+      group bounds
+    """
+    std = df.std(axis=1)
+    mean = df.mean(axis=1)
+    # If we have a single item checking the variance is useless
+    deviance = (std / mean * 100).where(df.count(axis=1) != 1, 0)
+    stats = {'std': std, 'mean': mean, 'sum': df.sum(axis=1),
+             'min': df.min(axis=1), 'max': df.max(axis=1),
+             'deviance': deviance, 'per_item': False}
+    if ("loops_per_sec" in mode) or ("bogomips" in mode):
+        stats['per_item'] = True
+    else:
+        stats['host_means'] = df.mean(axis=0).to_numpy()
+    return stats
+
+
 def print_perf(tolerance_min, tolerance_max, item, df, mode, title,
                global_params, names_dict, vis, group_number, consistent=None,
                curious=None, unstable=None, sub_graph="", rampup_value=0,
-               current_dir=""):
+               current_dir="", stats=None):
     # Tolerance_min represents the min where variance
     # shall be considered (in %)
     # Tolerance_max represents the maximum that variance
     # represent regarding the average (in %)
+    # stats are the group_stats() of df, computed here if not given
 
-    variance_group = item.std()
-    mean_group = item.mean()
-    sum_group = item.sum()
+    if stats is None:
+        stats = group_stats(df, mode)
+    variance_group = stats['std'][title]
+    mean_group = stats['mean'][title]
+    sum_group = stats['sum'][title]
     min_group = mean_group - 2 * variance_group
     max_group = mean_group + 2 * variance_group
 
     utils.do_print(mode, utils.Levels.INFO,
                    "%-12s : Group performance : min=%8.2f, mean=%8.2f, "
-                   "max=%8.2f, stddev=%8.2f", title, item.min(),
-                   mean_group, item.max(), variance_group)
+                   "max=%8.2f, stddev=%8.2f", title, stats['min'][title],
+                   mean_group, stats['max'][title], variance_group)
 
-    variance_tolerance = compute_deviance_percentage(title, df.transpose())
+    variance_tolerance = stats['deviance'][title]
 
     if (rampup_value > 0) and (current_dir):
         utils.write_gnuplot_file(current_dir + "/deviance.plot",
@@ -369,106 +467,88 @@ def print_perf(tolerance_min, tolerance_max, item, df, mode, title,
         utils.write_gnuplot_file(current_dir + "/sum%s.plot" % sub_graph,
                                  rampup_value, sum_group)
 
+    hosts = df.columns
     if variance_tolerance > tolerance_max:
         utils.do_print(mode, utils.Levels.ERROR,
                        "%-12s : Group's variance is too important : %7.2f%% "
                        "of %7.2f whereas limit is set to %3.2f%%", title,
-                       variance_tolerance, mean_group, tolerance_max)
+                       variance_tolerance, mean_group, tolerance_max,
+                       channels=PERF_CHANNELS)
         utils.do_print(mode, utils.Levels.ERROR,
-                       "%-12s : Group performance : UNSTABLE", title)
-        with open("%s/results/_perf_summary" % global_params["output_dir"],
-                  "a") as f:
-            orig_stdout = sys.stdout
-            sys.stdout = f
-            utils.do_print(mode, utils.Levels.ERROR,
-                           "%-12s : Group's variance is too important : "
-                           "%7.2f%% of %7.2f whereas limit is set to %3.2f%%",
-                           title, variance_tolerance, mean_group,
-                           tolerance_max)
-            utils.do_print(mode, utils.Levels.ERROR,
-                           "%-12s : Group performance : UNSTABLE", title)
-            sys.stdout = orig_stdout
-        for host in df.columns:
-            if host not in curious:
-                unstable.append(host)
+                       "%-12s : Group performance : UNSTABLE", title,
+                       channels=PERF_CHANNELS)
+        curious_hosts = set(curious)
+        unstable.extend(host for host in hosts if host not in curious_hosts)
+        utils.reporter.record(export.metric_record(
+            group_number, mode, title, item.count(), stats, tolerance_min,
+            tolerance_max, "unstable"))
 
         if vis:
             vis.add_item_varperf(item, group_number, mode, title)
     else:
-        curious_performance = False
-        for host in df.columns:
-            if (("loops_per_sec") in mode) or ("bogomips" in mode):
-                mean_host = df[host][title].mean()
-            else:
-                mean_host = df[host].mean()
-            # If the variance is very low, don't try to find the black sheep
-            if variance_tolerance > tolerance_min:
-                if mean_host > max_group:
-                    if vis:
-                        vis.add_item_overperf(item, group_number, mode, title)
-                    curious_performance = True
-                    percent_above = 100 * (mean_host - max_group) / max_group
-                    utils.do_print(
-                        mode, utils.Levels.WARNING,
-                        "%-12s : %s : Curious overperformance  %7.2f : "
-                        "min_allow_group = %.2f, mean_group = %.2f "
-                        "max_allow_group = %.2f, "
-                        "%3.2f%% above max", title, names_dict[host],
-                        mean_host, min_group, mean_group, max_group,
-                        percent_above)
-                    with open("%s/results/_perf_summary"
-                              % global_params["output_dir"], "a") as f:
-                        orig_stdout = sys.stdout
-                        sys.stdout = f
-                        utils.do_print(
-                            mode, utils.Levels.WARNING,
-                            "%-12s : %s : Curious overperformance  %7.2f : "
-                            "min_allow_group = %.2f, mean_group = %.2f "
-                            "max_allow_group = %.2f, "
-                            "%3.2f%% above max", title, names_dict[host],
-                            mean_host, min_group, mean_group, max_group,
-                            percent_above)
-                        sys.stdout = orig_stdout
-                    if host not in curious:
-                        curious.append(host)
-                        if host in consistent:
-                            consistent.remove(host)
-                elif mean_host < min_group:
-                    if vis:
-                        vis.add_item_underperf(item, group_number, mode, title)
-                    curious_performance = True
-                    percent_below = 100 * (min_group - mean_host) / min_group
-                    utils.do_print(
-                        mode, utils.Levels.WARNING,
-                        "%-12s : %s : Curious underperformance %7.2f : "
-                        "min_allow_group = %.2f, mean_group = %.2f "
-                        "max_allow_group = %.2f, "
-                        "%3.2f%% below min", title, names_dict[host],
-                        mean_host, min_group, mean_group, max_group,
-                        percent_below)
-                    with open("%s/results/_perf_summary"
-                              % global_params["output_dir"], "a") as f:
-                        orig_stdout = sys.stdout
-                        sys.stdout = f
-                        utils.do_print(
-                            mode, utils.Levels.WARNING,
-                            "%-12s : %s : Curious underperformance %7.2f : "
-                            "min_allow_group = %.2f, mean_group = %.2f "
-                            "max_allow_group = %.2f, "
-                            "%3.2f%% below min", title, names_dict[host],
-                            mean_host, min_group, mean_group, max_group,
-                            percent_below)
-                        sys.stdout = orig_stdout
-                    if host not in curious:
-                        curious.append(host)
-                        if host in consistent:
-                            consistent.remove(host)
-                else:
-                    if (host not in consistent) and (host not in curious):
-                        consistent.append(host)
+        if stats['per_item']:
+            host_means = df.loc[title].to_numpy()
+        else:
+            host_means = stats['host_means']
+        # If the variance is very low, don't try to find the black sheep
+        if variance_tolerance > tolerance_min:
+            over = host_means > max_group
+            under = ~over & (host_means < min_group)
+        else:
+            over = under = numpy.zeros(len(hosts), dtype=bool)
+        flagged = numpy.flatnonzero(over | under)
+        curious_performance = len(flagged) > 0
+
+        if vis and over.any():
+            vis.add_item_overperf(item, group_number, mode, title)
+        if vis and under.any():
+            vis.add_item_underperf(item, group_number, mode, title)
+
+        for index in flagged:
+            if over[index]:
+                percent_above = (100 * (host_means[index] - max_group) /
+                                 max_group)
+                utils.do_print(
+                    mode, utils.Levels.WARNING,
+                    "%-12s : %s : Curious overperformance  %7.2f : "
+                    "min_allow_group = %.2f, mean_group = %.2f "
+                    "max_allow_group = %.2f, "
+                    "%3.2f%% above max", title, names_dict[hosts[index]],
+                    host_means[index], min_group, mean_group, max_group,
+                    percent_above,
+                    channels=PERF_CHANNELS)
             else:
-                if (host not in consistent) and (host not in curious):
-                    consistent.append(host)
+                percent_below = (100 * (min_group - host_means[index]) /
+                                 min_group)
+                utils.do_print(
+                    mode, utils.Levels.WARNING,
+                    "%-12s : %s : Curious underperformance %7.2f : "
+                    "min_allow_group = %.2f, mean_group = %.2f "
+                    "max_allow_group = %.2f, "
+                    "%3.2f%% below min", title, names_dict[hosts[index]],
+                    host_means[index], min_group, mean_group, max_group,
+                    percent_below,
+                    channels=PERF_CHANNELS)
+
+        # Flagged hosts become curious, the others consistent unless they
+        # were already found curious
+        known = set(curious)
+        new_curious = [hosts[index] for index in flagged
+                       if hosts[index] not in known]
+        if new_curious:
+            curious.extend(new_curious)
+            known.update(new_curious)
+            consistent[:] = [host for host in consistent
+                             if host not in known]
+        known.update(consistent)
+        consistent.extend(host for host, flag in zip(hosts, over | under)
+                          if not flag and host not in known)
+
+        utils.reporter.record(export.metric_record(
+            group_number, mode, title, item.count(), stats, tolerance_min,
+            tolerance_max,
+            "suspicious" if curious_performance else "consistent",
+            hosts[over], hosts[under]))
 
         unit = " "
         if "Effi." in title:
@@ -494,8 +574,9 @@ def print_summary(mode, array, array_name, unit, df, item_value=None):
         WHITE = "\033[1;m"
         GREEN = "\033[1;32m"
 
+        sums = df.sum()
         for host in array:
-            result.append(df[host].sum())
+            result.append(sums[host])
         if "unstable" in array_name:
             before = RED
             after = WHITE
@@ -543,9 +624,11 @@ def print_summary(mode, array, array_name, unit, df, item_value=None):
         utils.do_print(mode, utils.Levels.SUMMARY, msg)
 
 
-def cpu_perf(system_list, unique_id, group_number, detail_options,
+def cpu_perf(perf_table, hosts, group_number, detail_options,
              global_params, names_dict, vis, rampup_value=0, current_dir=""):
     have_cpu_data = False
+    system_list = perf_table.systems(hosts, "cpu")
+    unique_id = perf_table.unique_id
     host_cpu_list = search_item(system_list, unique_id, "cpu", "(.*)", [],
                                 ['product'])
     host_cpu_number = search_item(system_list, unique_id, "cpu",
@@ -563,61 +646,53 @@ def cpu_perf(system_list, unique_id, group_number, detail_options,
             break
 
     modes = ['bogomips', 'loops_per_sec']
-    sets = search_item(system_list, unique_id, "cpu", "(.*)", [], modes)
+    columns, rows = perf_table.rows(hosts, "cpu")
     global_perf = dict()
     for mode in sorted(modes):
-        results = {}
-        for system in sets:
-            cpu = []
-            series = []
-            found_data = False
-            for perf in sets[system]:
-                if perf[2] == mode:
-                    # We shall split individual cpu benchmarking from
-                    # the global one
-                    if "_" in perf[1]:
-                        if not perf[1] in cpu:
-                            cpu.append(perf[1])
-                        series.append(float(perf[3]))
-                        found_data = True
-                    elif "loops_per_sec" in mode:
-                        global_perf[system] = float(perf[3])
-                        found_data = True
-
-            if found_data is True:
-                # If no series are populated, it means that a single
-                # "All CPU" run was done
-                # If so, let's create a single run value
-                if not series:
-                    series.append(global_perf[system])
-                    cpu.append("logical")
-
-                results[system] = Series(series, dtype='float64', index=cpu)
+        mode_rows = rows[rows['metric'] == mode]
+        # We shall split individual cpu benchmarking from
+        # the global one
+        individual = mode_rows['device'].str.contains("_", regex=False)
+        series = mode_rows[individual]
+        found_data = set(series['host'])
+        if "loops_per_sec" in mode:
+            overall = mode_rows[~individual]
+            global_perf.update(zip(overall['host'], overall['value']))
+            found_data.update(overall['host'])
+
+        # If no series are populated, it means that a single
+        # "All CPU" run was done
+        # If so, let's create a single run value
+        with_series = set(series['host'])
+        single = [system for system in columns
+                  if system in found_data and system not in with_series]
+        if single:
+            series = concat([series, DataFrame({
+                'host': single, 'device': "logical",
+                'value': [global_perf[system] for system in single]})])
 
         # No need to continue if no CPU data in this benchmark
-        if not results:
+        if not found_data:
             continue
 
-        df = DataFrame(results)
+        df = perftable.pivot(series, [system for system in columns
+                                      if system in found_data])
         consistent = []
         curious = []
         unstable = []
         details = []
         matched_category = []
 
-        for cpu in df.transpose().columns:
+        stats = group_stats(df, mode)
+        for cpu in df.index:
             if have_cpu_data is False:
-                print()
-                print("Group %d : Checking CPU perf" % group_number)
-                with open("%s/results/_perf_summary"
-                          % global_params["output_dir"], "a") as f:
-                    print(file=f)
-                    print("Group %d : Checking CPU perf" %
-                          group_number, file=f)
+                utils.reporter.print(channels=PERF_CHANNELS)
+                utils.reporter.print("Group %d : Checking CPU perf" %
+                                     group_number, channels=PERF_CHANNELS)
                 have_cpu_data = True
-            print_perf(2, 7, df.transpose()[cpu], df, mode, cpu, global_params,
+            print_perf(2, 7, df.loc[cpu], df, mode, cpu, global_params,
                        names_dict, vis, group_number, consistent, curious,
-                       unstable, "", rampup_value, current_dir)
+                       unstable, "", rampup_value, current_dir, stats)
             prepare_detail(detail_options, group_number, mode, cpu, details,
                            matched_category)
 
@@ -636,7 +711,9 @@ def cpu_perf(system_list, unique_id, group_number, detail_options,
             details = []
             matched_category = []
 
-            for system in sets:
+            for system in df.columns:
+                if system not in global_perf:
+                    continue
                 host_efficiency_full_load = []
                 host_perf = (df[system].sum() *
                              (int(core_counts) / df[system].count()))
@@ -646,7 +723,7 @@ def cpu_perf(system_list, unique_id, group_number, detail_options,
                                             dtype='float64', index=[mode_text])
 
             cpu_eff = DataFrame(efficiency)
-            print_perf(1, 2, cpu_eff.transpose()[mode_text], cpu_eff, mode,
+            print_perf(1, 2, cpu_eff.loc[mode_text], cpu_eff, mode,
                        mode_text, global_params, names_dict, vis, group_number,
                        consistent, curious, unstable)
             prepare_detail(detail_options, group_number, mode, mode_text,
@@ -659,51 +736,48 @@ def cpu_perf(system_list, unique_id, group_number, detail_options,
             print_summary("CPU Efficiency", unstable, "unstable", '%', cpu_eff)
 
 
-def memory_perf(system_list, unique_id, group_number, detail_options,
+def memory_perf(perf_table, hosts, group_number, detail_options,
                 global_params, names_dict, vis, rampup_value=0,
                 current_dir=""):
     have_memory_data = False
     modes = ['1K', '4K', '1M', '16M', '128M', '256M', '1G', '2G']
-    sets = search_item(system_list, unique_id, "cpu", "(.*)", [], modes)
+    columns, rows = perf_table.rows(hosts, "cpu")
     for mode in sorted(modes):
         real_mode = "Memory benchmark %s" % mode
-        results = {}
-        threaded_perf = dict()
-        forked_perf = dict()
-        for system in sets:
-            memory = []
-            series = []
-            found_data = ""
-            threaded_perf[system] = 0
-            forked_perf[system] = 0
-            for perf in sets[system]:
-                if mode in perf[2]:
-                    # We shall split individual cpu benchmarking from
-                    # the global one
-                    if ("logical_" in perf[1] and
-                            ("bandwidth_%s" % mode) in perf[2]):
-                        if not perf[1] in memory:
-                            memory.append(perf[1])
-                        series.append(float(perf[3]))
-                    elif "threaded_bandwidth_%s" % mode in perf[2]:
-                        threaded_perf[system] = float(perf[3])
-                        found_data = float(perf[3])
-                    elif "forked_bandwidth_%s" % mode in perf[2]:
-                        forked_perf[system] = float(perf[3])
-                        found_data = float(perf[3])
-
-            if found_data:
-                # If no series are populated, it means that a single "All CPU"
-                # run was done
-                # If so, let's create a single run value
-                if not series:
-                    series.append(found_data)
-                    memory.append("logical")
-
-            results[system] = Series(series, dtype='float64', index=memory)
+        mode_rows = rows[rows['metric'].str.contains(mode, regex=False)]
+        # We shall split individual cpu benchmarking from
+        # the global one
+        individual = (
+            mode_rows['device'].str.contains("logical_", regex=False) &
+            mode_rows['metric'].str.contains("bandwidth_%s" % mode,
+                                             regex=False))
+        threaded = ~individual & mode_rows['metric'].str.contains(
+            "threaded_bandwidth_%s" % mode, regex=False)
+        forked = ~individual & ~threaded & mode_rows['metric'].str.contains(
+            "forked_bandwidth_%s" % mode, regex=False)
+        threaded_perf = dict.fromkeys(columns, 0)
+        threaded_perf.update(zip(mode_rows[threaded]['host'],
+                                 mode_rows[threaded]['value']))
+        forked_perf = dict.fromkeys(columns, 0)
+        forked_perf.update(zip(mode_rows[forked]['host'],
+                               mode_rows[forked]['value']))
+        found_data = dict(zip(mode_rows[threaded | forked]['host'],
+                              mode_rows[threaded | forked]['value']))
+
+        # If no series are populated, it means that a single "All CPU"
+        # run was done
+        # If so, let's create a single run value
+        series = mode_rows[individual]
+        with_series = set(series['host'])
+        single = [system for system in columns
+                  if found_data.get(system) and system not in with_series]
+        if single:
+            series = concat([series, DataFrame({
+                'host': single, 'device': "logical",
+                'value': [found_data[system] for system in single]})])
 
         # No need to continue if no Memory data in this benchmark
-        if not results:
+        if not columns:
             continue
 
         consistent = []
@@ -712,22 +786,19 @@ def memory_perf(system_list, unique_id, group_number, detail_options,
         details = []
         matched_category = ''
 
-        df = DataFrame(results)
-        for memory in df.transpose().columns:
+        df = perftable.pivot(series, columns)
+        stats = group_stats(df, real_mode)
+        for memory in df.index:
             if have_memory_data is False:
-                print()
-                print("Group %d : Checking Memory perf" % group_number)
-                with open("%s/results/_perf_summary"
-                          % global_params["output_dir"], "a") as f:
-                    print(file=f)
-                    print("Group %d : Checking Memory perf" %
-                          group_number, file=f)
+                utils.reporter.print(channels=PERF_CHANNELS)
+                utils.reporter.print("Group %d : Checking Memory perf" %
+                                     group_number, channels=PERF_CHANNELS)
                 have_memory_data = True
 
-            print_perf(1, 7, df.transpose()[memory], df, real_mode, memory,
+            print_perf(1, 7, df.loc[memory], df, real_mode, memory,
                        global_params, names_dict, vis, group_number,
                        consistent, curious, unstable, "", rampup_value,
-                       current_dir)
+                       current_dir, stats)
             matched_category = []
             prepare_detail(detail_options, group_number, mode, memory,
                            details, matched_category)
@@ -744,7 +815,7 @@ def memory_perf(system_list, unique_id, group_number, detail_options,
                 mode_text = "Thread effi."
             else:
                 mode_text = "Forked Effi."
-            for system in sets:
+            for system in columns:
                 host_efficiency_full_load = []
                 host_perf = df[system].sum()
                 if (host_perf > 0 and threaded_perf[system] > 0 and
@@ -768,11 +839,12 @@ def memory_perf(system_list, unique_id, group_number, detail_options,
                 curious = []
                 unstable = []
 
-                for memory in memory_eff.transpose().columns:
-                    print_perf(2, 10, memory_eff.transpose()[memory],
+                stats = group_stats(memory_eff, real_mode)
+                for memory in memory_eff.index:
+                    print_perf(2, 10, memory_eff.loc[memory],
                                memory_eff, real_mode, memory, global_params,
                                names_dict, vis, group_number, consistent,
-                               curious, unstable)
+                               curious, unstable, stats=stats)
                     matched_category = []
                     prepare_detail(detail_options, group_number, mode,
                                    memory, details, matched_category)
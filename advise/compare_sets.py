@@ -13,30 +13,69 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import collections
+import hashlib
 import pprint
 
+from advise import utils
 
-class Machine:
+# Messages shown on the console and kept in the summary
+BOTH = (utils.CONSOLE, utils.SUMMARY)
 
-    def __init__(self, name, value):
-        self.name = name
-        self.value = value
 
+class Fingerprint:
+    """Canonical form of a set of hardware components
+
+    The components are kept sorted in a tuple, so identical sets always give
+    the same fingerprint whatever their iteration order, and a fixed size
+    digest of that tuple is used for hashing and comparisons. Iterating
+    over a fingerprint yields the original components.
+    """
+
+    __slots__ = ('items', 'digest')
+
+    def __init__(self, components):
+        try:
+            items = tuple(sorted(components))
+        except TypeError:
+            # Values of different types cannot be ordered together
+            items = tuple(sorted(components, key=repr))
+        self.items = items
+        self.digest = hashlib.blake2b(repr(items).encode('utf-8'),
+                                      digest_size=16).hexdigest()
+
+    def __getstate__(self):
+        return self.items, self.digest
+
+    def __setstate__(self, state):
+        self.items, self.digest = state
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __eq__(self, other):
+        if not isinstance(other, Fingerprint):
+            return NotImplemented
+        return self.digest == other.digest
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return "Fingerprint(%s)" % self.digest
 
-def compare(sets):
-    machines = []
-    for current_set in sets:
-        my_string = repr(sets[current_set])
-        machines.append(Machine(current_set, my_string))
 
-    to_be_sorted = collections.defaultdict(list)
-    for machine in machines:
-        key = machine.value
-        value = machine.name
-        to_be_sorted[key].append(value)
+def compare(sets):
+    # Identical sets are bucketed first so each distinct set of components
+    # is only sorted and hashed once
+    to_be_sorted = {}
+    for name in sets:
+        to_be_sorted.setdefault(frozenset(sets[name]), []).append(name)
 
-    return dict(to_be_sorted)
+    return dict((Fingerprint(components), names)
+                for components, names in to_be_sorted.items())
 
 
 def get_hosts_list_from_result(result):
@@ -50,38 +89,29 @@ def get_hosts_list_from_result(result):
 
 
 def print_systems_groups(systems_groups, global_params, vis):
+    report = utils.reporter
     total_hosts = 0
     for system in systems_groups:
         total_hosts += len(system)
-    print("The %d systems can be grouped in %d groups of "
-          "identical hardware" % (total_hosts, len(systems_groups)))
+    report.print("The %d systems can be grouped in %d groups of "
+                 "identical hardware" % (total_hosts, len(systems_groups)),
+                 channels=BOTH)
     for system in systems_groups:
-        print("Group %d (%d Systems)" % (
-            systems_groups.index(system), len(system)))
-        print("-> " + ', '.join(system))
-        print()
+        report.print("Group %d (%d Systems)" % (
+            systems_groups.index(system), len(system)), channels=BOTH)
+        report.print("-> " + ', '.join(system), channels=BOTH)
+        report.print()
 
     if "output_dir" in global_params.keys():
-        with open("%s/results/_summary" % global_params["output_dir"],
-                  "a") as f:
-            print("The %d systems can be grouped in %d groups of "
-                  "identical hardware" % (total_hosts, len(systems_groups)),
-                  file=f)
-            for system in systems_groups:
-                print("Group %d (%d Systems)" % (
-                    systems_groups.index(system), len(system)), file=f)
-                print("-> " + ', '.join(system), file=f)
-                vis.add_group(systems_groups.index(system),
-                              "Group %s" % systems_groups.index(system),
-                              list(system))
+        for system in systems_groups:
+            vis.add_group(systems_groups.index(system),
+                          "Group %s" % systems_groups.index(system),
+                          list(system))
 
 
 def print_groups(global_params, result, title):
-    print("##### %s #####" % title)
-    if "output_dir" in global_params.keys():
-        with open("%s/results/_summary" % global_params["output_dir"],
-                  "a") as f:
-            print("##### %s #####" % title, file=f)
+    report = utils.reporter
+    report.print("##### %s #####" % title, channels=BOTH)
     groups_name = ""
 
     for element in result:
@@ -98,21 +128,15 @@ def print_groups(global_params, result, title):
         group_name = group_name[:100]
 
         groups_name = "%s '%s.def'" % (groups_name, group_name)
-        print("%d identical systems :" % (len(group)))
-        print(group)
-
-        if "output_dir" in global_params.keys():
-            with open("%s/results/_summary" % global_params["output_dir"],
-                      "a") as f:
-                print("%d identical systems :" % (len(group)), file=f)
-                print(group, file=f)
+        report.print("%d identical systems :" % (len(group)), channels=BOTH)
+        report.print(group, channels=BOTH)
 
-        pprint.pprint(sorted(eval(element)))
+        report.print(pprint.pformat(list(element)))
 
         # But always save it to a file for diffing
         # if "output_dir" in global_params.keys():
         #     with open("%s.def" % group_name, "w") as fout:
-        #         pprint.pprint(sorted(eval(element)), fout)
+        #         pprint.pprint(list(element), fout)
         # print()
 
     # if "output_dir" in global_params.keys():
@@ -128,26 +152,46 @@ def print_groups(global_params, result, title):
             #                            title.strip().replace(" ", "_"))):
             #     os.remove(filename)
 
-    print("######" * 2 + "#" * len(title))
-    if "output_dir" in global_params.keys():
-        with open("%s/results/_summary" % global_params["output_dir"],
-                  "a") as f:
-            print("######" * 2 + "#" * len(title), file=f)
+    report.print("######" * 2 + "#" * len(title), channels=BOTH)
+
+
+class Partition:
+    """Systems split in blocks of identical hardware
+
+    Every system is mapped to a block id. Refining the partition with the
+    result of a check splits each block by the group its systems belong to
+    in that result, in a single pass over the systems. Block ids are given
+    in order of first appearance of the systems, so the numbering only
+    depends on the systems order, not on the refinements order.
+    """
+
+    def __init__(self, systems):
+        self.blocks = {}
+        for system in systems:
+            self.blocks.setdefault(system, 0)
+
+    def refine(self, groups):
+        # groups is an iterable of collections of systems, e.g the values
+        # of a compare() result
+        signatures = {}
+        for signature, group in enumerate(groups):
+            for system in group:
+                signatures[system] = signature
+        new_blocks = {}
+        for system, block in self.blocks.items():
+            key = (block, signatures.get(system))
+            self.blocks[system] = new_blocks.setdefault(key, len(new_blocks))
+
+    def groups(self):
+        groups = {}
+        for system, block in self.blocks.items():
+            groups.setdefault(block, set()).add(system)
+        return list(groups.values())
 
 
 def compute_similar_hosts_list(systems_groups, new_groups):
-    for group in new_groups:
-        for systems_group in systems_groups:
-            intersection = set.intersection(systems_group, group)
-            if intersection:
-                if len(intersection) < len(systems_group):
-                    # We do have a partial match meaning we shall break
-                    # the existing group in pieces
-                    difference = set.difference(systems_group, group)
-                    # The group we worked on doesn't exist anymore
-                    # So let's delete it
-                    systems_groups.remove(systems_group)
-
-                    # Let's add the two sub groups generated by this split
-                    systems_groups.append(intersection)
-                    systems_groups.append(difference)
+    partition = Partition(system for group in systems_groups
+                          for system in group)
+    partition.refine(systems_groups)
+    partition.refine(new_groups)
+    systems_groups[:] = partition.groups()
@@ -0,0 +1,107 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Machine readable results of advise-process.
+
+Next to the text reports, ``results/results.jsonl`` holds one JSON object
+per line, its ``type`` being one of:
+
+* ``group``: a group of identical systems and its members
+* ``fingerprint``: the systems sharing a fingerprint for a hardware check
+* ``metric``: the statistics of a benchmark item in a group, and the hosts
+  found above or below the group bounds
+
+The metric records can also be written to ``results/metrics.npz``, one
+array per field, which numpy.load() reads without pickle.
+"""
+
+import json
+import math
+
+import numpy
+
+METRIC_COLUMNS = (("group", "i4"), ("mode", "U"), ("item", "U"),
+                  ("hosts", "i4"), ("mean", "f8"), ("std", "f8"),
+                  ("min", "f8"), ("max", "f8"), ("sum", "f8"),
+                  ("deviance", "f8"), ("tolerance_min", "f8"),
+                  ("tolerance_max", "f8"), ("status", "U"),
+                  ("overperf", "i4"), ("underperf", "i4"))
+
+
+def number(value):
+    # NaN is not valid JSON
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return value
+
+
+def group_record(group_number, members, names_dict):
+    return {"type": "group",
+            "group": group_number,
+            "members": [{"serial": member, "name": names_dict.get(member)}
+                        for member in members]}
+
+
+def fingerprint_records(title, item, result):
+    for fingerprint, names in result.items():
+        yield {"type": "fingerprint",
+               "check": title,
+               "item": item,
+               "fingerprint": fingerprint.digest,
+               "members": list(names),
+               "components": [list(component) for component in fingerprint]}
+
+
+def metric_record(group_number, mode, title, count, stats, tolerance_min,
+                  tolerance_max, status, overperf=(), underperf=()):
+    record = {"type": "metric",
+              "group": group_number,
+              "mode": mode,
+              "item": title,
+              "hosts": int(count)}
+    for field in ("mean", "std", "min", "max", "sum", "deviance"):
+        record[field] = number(stats[field][title])
+    record.update(tolerance_min=tolerance_min, tolerance_max=tolerance_max,
+                  status=status, overperf=list(overperf),
+                  underperf=list(underperf))
+    return record
+
+
+def iter_records(path, record_type=None):
+    """Yield the records of a results.jsonl file"""
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record_type is None or record["type"] == record_type:
+                yield record
+
+
+def write_columnar(results_path, path):
+    """Write the metric records of results_path as columns in path"""
+    columns = dict((name, []) for name, _ in METRIC_COLUMNS)
+    for record in iter_records(results_path, "metric"):
+        for name, _ in METRIC_COLUMNS:
+            value = record[name]
+            if name in ("overperf", "underperf"):
+                value = len(value)
+            elif value is None:
+                value = math.nan
+            columns[name].append(value)
+    arrays = {}
+    for name, dtype in METRIC_COLUMNS:
+        if dtype == "U":
+            arrays[name] = numpy.array(columns[name], dtype=str)
+        else:
+            arrays[name] = numpy.array(columns[name], dtype=dtype)
+    numpy.savez_compressed(path, **arrays)
@@ -0,0 +1,261 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Columnar container holding the extra hardware data of a whole fleet.
+
+The file starts with a small JSON header followed by raw little endian
+arrays. Every ``(category, sub, key, value)`` tuple is a row made of four
+codes into a shared dictionary of values, plus the index of the node it
+belongs to. Rows are sorted by category, and the header records the rows
+range of each category, so loading a few categories only maps the pages
+holding them.
+
+Layout::
+
+    magic (8 bytes) | version (uint32) | header size (uint32) | header
+    | padding to 8 bytes | arrays
+"""
+
+import array
+import json
+import mmap
+import struct
+
+import numpy
+
+MAGIC = b"ADVFLEET"
+VERSION = 1
+
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 8
+
+# Types of the dictionary entries
+_STR, _INT, _FLOAT, _NONE, _BOOL = range(5)
+
+_COLUMNS = ("node", "category", "sub", "key", "value")
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return _STR, value
+    if isinstance(value, bool):
+        return _BOOL, "1" if value else "0"
+    if isinstance(value, int):
+        return _INT, str(value)
+    if isinstance(value, float):
+        return _FLOAT, repr(value)
+    if value is None:
+        return _NONE, ""
+    raise ValueError("Unsupported value in fleet store: %r" % (value,))
+
+
+def _decode(kind, text):
+    if kind == _STR:
+        return text
+    if kind == _INT:
+        return int(text)
+    if kind == _FLOAT:
+        return float(text)
+    if kind == _BOOL:
+        return text == "1"
+    return None
+
+
+class FleetWriter:
+    """Accumulate nodes then write them as a single fleet file"""
+
+    def __init__(self):
+        self.nodes = []
+        self._codes = {}
+        self._entries = []
+        # category code -> node, sub, key, value columns
+        self._rows = {}
+
+    def _code(self, value):
+        entry = _encode(value)
+        code = self._codes.get(entry)
+        if code is None:
+            code = len(self._entries)
+            self._codes[entry] = code
+            self._entries.append(entry)
+        return code
+
+    def add_node(self, name, tuples):
+        node = len(self.nodes)
+        self.nodes.append(name)
+        for item in tuples:
+            if len(item) != 4 or not isinstance(item[0], str):
+                raise ValueError("%s: cannot store %r in a fleet file" %
+                                 (name, item))
+            category = self._code(item[0])
+            if category not in self._rows:
+                self._rows[category] = tuple(array.array("I")
+                                             for _ in range(4))
+            columns = self._rows[category]
+            columns[0].append(node)
+            columns[1].append(self._code(item[1]))
+            columns[2].append(self._code(item[2]))
+            columns[3].append(self._code(item[3]))
+
+    def write(self, path):
+        categories = {}
+        columns = dict((name, array.array("I")) for name in _COLUMNS)
+        for category in sorted(self._rows,
+                               key=lambda code: self._entries[code][1]):
+            node, sub, key, value = self._rows[category]
+            start = len(columns["node"])
+            columns["node"].extend(node)
+            columns["category"].extend([category] * len(node))
+            columns["sub"].extend(sub)
+            columns["key"].extend(key)
+            columns["value"].extend(value)
+            categories[self._entries[category][1]] = [start,
+                                                      len(columns["node"])]
+
+        blobs = [text.encode("utf-8") for _, text in self._entries]
+        offsets = numpy.zeros(len(blobs) + 1, dtype="<i8")
+        numpy.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+        arrays = [(name, numpy.frombuffer(columns[name], dtype=numpy.uint32)
+                   .astype("<u4", copy=False)) for name in _COLUMNS]
+        arrays.append(("dict_offsets", offsets))
+        arrays.append(("dict_types", numpy.array(
+            [kind for kind, _ in self._entries], dtype="|u1")))
+        arrays.append(("dict_blob", numpy.frombuffer(b"".join(blobs),
+                                                     dtype="|u1")))
+
+        # Offsets are relative to the start of the data section, so the
+        # header can be serialised before knowing its own size.
+        header = {"nodes": self.nodes,
+                  "rows": len(columns["node"]),
+                  "categories": categories,
+                  "arrays": {}}
+        position = 0
+        for name, data in arrays:
+            header["arrays"][name] = [position, data.dtype.str, len(data)]
+            position += -(-data.nbytes // _ALIGN) * _ALIGN
+        header = json.dumps(header).encode("utf-8")
+
+        with open(path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            for name, data in arrays:
+                f.write(data.tobytes())
+                f.write(b"\0" * (-data.nbytes % _ALIGN))
+
+
+class FleetStore:
+    """Memory mapped, read only access to a fleet file
+
+    Opening a store only parses its header, the columns are mapped from the
+    file and decoded on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _PREFIX.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("%s is not a fleet file" % path)
+        if version != VERSION:
+            raise ValueError("%s: unsupported fleet file version %d" %
+                             (path, version))
+        header_end = _PREFIX.size + size
+        header = json.loads(self._map[_PREFIX.size:header_end])
+        self.nodes = header["nodes"]
+        self.rows = header["rows"]
+        self.categories = header["categories"]
+        data_start = header_end + (-header_end % _ALIGN)
+        self._arrays = {}
+        for name, (offset, dtype, count) in header["arrays"].items():
+            self._arrays[name] = numpy.frombuffer(
+                self._map, dtype=dtype, count=count,
+                offset=data_start + offset)
+        self._values = {}
+
+    def close(self):
+        self._arrays = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # Some columns are still referenced, the mapping is released
+            # once they are garbage collected.
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def value(self, code):
+        """Return the python value of a dictionary code"""
+        try:
+            return self._values[code]
+        except KeyError:
+            offsets = self._arrays["dict_offsets"]
+            start, end = int(offsets[code]), int(offsets[code + 1])
+            text = self._arrays["dict_blob"][start:end].tobytes()
+            value = _decode(int(self._arrays["dict_types"][code]),
+                            text.decode("utf-8"))
+            self._values[code] = value
+            return value
+
+    def column(self, name, categories=None):
+        """Return the raw codes of a column, limited to some categories"""
+        data = self._arrays[name]
+        if categories is None:
+            return data
+        ranges = [self.categories[category] for category in categories
+                  if category in self.categories]
+        if not ranges:
+            return data[:0]
+        return numpy.concatenate([data[start:end] for start, end in ranges])
+
+    def load(self, categories=None):
+        """Return the node names and their list of tuples
+
+        Args:
+          categories ([str]): only load the rows of those categories,
+                              everything is loaded when None
+
+        Returns:
+          ``(names, bench_values)`` where ``bench_values`` holds one list of
+          tuples per node, in the order of ``names``. The tuples of a node
+          are sorted by category, which is the order m2-convert writes.
+        """
+        if categories is not None:
+            categories = sorted(set(categories) & set(self.categories))
+        bench_values = [[] for _ in self.nodes]
+        value = self.value
+        rows = zip(*(self.column(name, categories).tolist()
+                     for name in _COLUMNS))
+        for node, category, sub, key, val in rows:
+            bench_values[node].append((value(category), value(sub),
+                                       value(key), value(val)))
+        return list(self.nodes), bench_values
+
+
+def write(path, nodes):
+    """Write ``(name, tuples)`` pairs to a fleet file"""
+    writer = FleetWriter()
+    for name, tuples in nodes:
+        writer.add_node(name, tuples)
+    writer.write(path)
+
+
+def load(path, categories=None):
+    """Shortcut for ``FleetStore(path).load(categories)``"""
+    with FleetStore(path) as store:
+        return store.load(categories)
@@ -0,0 +1,164 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Loader for the extra hardware files produced by
+``m2-convert --output-format eval``.
+
+Those files hold the python representation of a list of
+``(category, sub, key, value)`` tuples. Rather than handing them to
+``eval``, the literals are tokenized directly and the tuples are yielded
+one at a time.
+"""
+
+import ast
+import concurrent.futures
+import re
+import time
+
+_CHUNK_SIZE = 1 << 16
+
+_LITERAL = (r"'(?:[^'\\\n]|\\.)*'"
+            r'|"(?:[^"\\\n]|\\.)*"'
+            r"|-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+            r"|None|True|False")
+
+# Fast path for the usual 4 elements tuple
+_TUPLE4 = re.compile(r"\s*\(\s*(%(lit)s)\s*,\s*(%(lit)s)\s*,\s*(%(lit)s)"
+                     r"\s*,\s*(%(lit)s)\s*,?\s*\)\s*(,?)" % {'lit': _LITERAL})
+_TUPLE = re.compile(r"\s*\(\s*((?:(?:%(lit)s)\s*,\s*)*(?:%(lit)s)?)\s*\)"
+                    r"\s*(,?)" % {'lit': _LITERAL})
+_TOKEN = re.compile(_LITERAL)
+_OPEN = re.compile(r"\s*\[")
+_CLOSE = re.compile(r"\s*\]\s*\Z")
+
+_CONSTANTS = {'None': None, 'True': True, 'False': False}
+
+
+def _decode(literal):
+    first = literal[0]
+    if first == "'" or first == '"':
+        if '\\' not in literal:
+            return literal[1:-1]
+        return ast.literal_eval(literal)
+    if literal in _CONSTANTS:
+        return _CONSTANTS[literal]
+    if '.' in literal or 'e' in literal or 'E' in literal:
+        return float(literal)
+    return int(literal)
+
+
+def iter_tuples(stream, chunk_size=_CHUNK_SIZE):
+    """Yield the tuples of an eval formatted extra hardware stream
+
+    Args:
+      stream: text file object to read from
+      chunk_size (int): number of characters read at once
+
+    Raises:
+      ValueError: if the stream is not a list of literal tuples
+    """
+    buf = ""
+    pos = 0
+    offset = 0
+    eof = False
+
+    def error():
+        return ValueError("Unexpected data at offset %d: %r" %
+                          (offset + pos, buf[pos:pos + 40]))
+
+    while True:
+        if not eof:
+            chunk = stream.read(chunk_size)
+            offset += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+        match = _OPEN.match(buf)
+        # Keep reading until we have something more than blanks
+        if match or eof or buf.strip():
+            break
+    if not match:
+        raise error()
+    pos = match.end()
+
+    while True:
+        match = _TUPLE4.match(buf, pos)
+        if match:
+            category, sub, key, value, _ = match.groups()
+            values = (_decode(category), _decode(sub), _decode(key),
+                      _decode(value))
+        else:
+            match = _TUPLE.match(buf, pos)
+            if match:
+                values = tuple(_decode(token.group()) for token in
+                               _TOKEN.finditer(match.group(1)))
+        # A match reaching the end of the buffer may have lost its
+        # separator, so only trust it once more data has been read.
+        if not eof and (not match or match.end() == len(buf)):
+            chunk = stream.read(chunk_size)
+            offset += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+        if not match:
+            if _CLOSE.match(buf, pos):
+                return
+            raise error()
+        yield values
+        pos = match.end()
+        if not match.groups()[-1]:
+            # No separator after the tuple, the list must end here
+            if not _CLOSE.match(buf, pos):
+                raise error()
+            return
+
+
+def load(path):
+    """Return the list of tuples stored in an eval formatted file
+
+    Anything the tokenizer does not understand is handed over to
+    ``ast.literal_eval``, so unusual literals are still accepted without
+    ever executing the file.
+    """
+    with open(path) as f:
+        try:
+            return list(iter_tuples(f))
+        except ValueError:
+            pass
+    with open(path) as f:
+        return ast.literal_eval(f.read())
+
+
+def _timed_load(path):
+    start = time.perf_counter()
+    data = load(path)
+    return data, time.perf_counter() - start
+
+
+def load_files(paths, jobs=1):
+    """Load several eval formatted files, possibly in a process pool
+
+    Args:
+      paths ([str]): files to load
+      jobs (int): number of worker processes, 1 loads them in-process
+
+    Returns:
+      list of ``(tuples, seconds)``, in the same order as ``paths``
+    """
+    if jobs > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (jobs * 4))
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            return list(executor.map(_timed_load, paths,
+                                     chunksize=chunksize))
+    return [_timed_load(path) for path in paths]
@@ -12,6 +12,7 @@ import json
 import sys
 import os
 
+from advise import fleetstore
 from advise.mungetout import process as m2convert
 from advise.mungetout import __version__
 
@@ -38,6 +39,14 @@ def parse_args(args):
                     "Ironic inspector")
     parser.add_argument(
         '--output_dir')
+    parser.add_argument(
+        '--fleet',
+        dest="fleet",
+        help="Also write all the nodes to a single fleet file, "
+             "<output_dir>/extra-hardware.fleet, which can be given to "
+             "advise-process --fleet",
+        action='store_true',
+        default=False)
     parser.add_argument(
         '--version',
         action='version',
@@ -92,6 +101,8 @@ def main(args):
     if not os.path.exists("%s/extra-hardware-filtered" % output_dir): os.mkdir("%s/extra-hardware-filtered" % output_dir)
     if not os.path.exists("%s/extra-hardware-json" % output_dir): os.mkdir("%s/extra-hardware-json" % output_dir)
 
+    fleet = fleetstore.FleetWriter() if args.fleet else None
+
     for path in args.files:
 
         # assume <node_name>.json
@@ -107,11 +118,14 @@ def main(args):
             '%s/extra-hardware-filtered' % output_dir, '%s.json' % node_name)
         json_path = os.path.join('%s/extra-hardware-json' % output_dir, '%s.json' % node_name)
 
+        extra = m2convert.clean(extra_data, filter_benchmarks=False,
+                                filter_serials=False)
+        if fleet is not None:
+            fleet.add_node(node_name, extra)
+
         with open(extra_path, 'w') as f:
-            orig_stdout = sys.stdout
-            sys.stdout = f
-            m2convert.internal_main(data=extra_data, filter_benchmarks=False, filter_serials=False, output_format="eval")
-            sys.stdout = orig_stdout
+            # Same output as m2-convert --output-format eval
+            print(extra, file=f)
             # cmd = 'm2-convert --output-format eval'
             # process = Popen(shlex.split(cmd), stdout=f, stdin=PIPE,
             #                 stderr=PIPE)
@@ -138,6 +152,9 @@ def main(args):
             # if rc != 0:
             #     print((stdout, stderr))
 
+    if fleet is not None:
+        fleet.write(os.path.join(output_dir, "extra-hardware.fleet"))
+
 
 def run():
     """Entry point for console_scripts
@@ -0,0 +1,129 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Aggregated graphs of many fingerprints.
+
+Joining every pair of fingerprints of a field gives n² edges, which a
+browser cannot draw for hundreds of groups. Instead, the fingerprints are
+joined by a minimum spanning tree, the weight of an edge being the number
+of T3 items (element, key, value) found in only one of its ends. Near
+identical fingerprints are then neighbours, and cutting the heaviest edges
+of the tree clusters them (single linkage). The nodes are placed on
+concentric rings around the root of the tree, so the browser only draws.
+"""
+
+import math
+
+import numpy
+
+
+def distances(item_sets):
+    """Return the number of items in only one of each pair of sets"""
+    codes = {}
+    for items in item_sets:
+        for item in items:
+            codes.setdefault(item, len(codes))
+    incidence = numpy.zeros((len(item_sets), len(codes)), dtype=numpy.float32)
+    for row, items in enumerate(item_sets):
+        incidence[row, [codes[item] for item in items]] = 1
+    shared = incidence @ incidence.T
+    sizes = numpy.diag(shared)
+    return (sizes[:, None] + sizes[None, :] - 2 * shared).astype(numpy.int64)
+
+
+def spanning_tree(weights):
+    """Return the (i, j, weight) edges of a minimum spanning tree (Prim)"""
+    count = len(weights)
+    if count == 0:
+        return []
+    in_tree = numpy.zeros(count, dtype=bool)
+    in_tree[0] = True
+    best = weights[0].astype(numpy.float64)
+    parent = numpy.zeros(count, dtype=numpy.int64)
+    edges = []
+    for _ in range(count - 1):
+        candidates = numpy.where(in_tree, numpy.inf, best)
+        node = int(numpy.argmin(candidates))
+        edges.append((int(parent[node]), node, int(weights[parent[node],
+                                                           node])))
+        in_tree[node] = True
+        closer = weights[node] < best
+        best[closer] = weights[node][closer]
+        parent[closer] = node
+    return edges
+
+
+def clusters(count, edges, limit):
+    """Return the cluster of each node, merging along the lightest edges
+
+    Returns:
+      a list giving the cluster number of each node, at most limit
+      clusters being numbered by first node
+    """
+    parent = list(range(count))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    components = count
+    for i, j, _ in sorted(edges, key=lambda edge: edge[2]):
+        if components <= limit:
+            break
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+            components -= 1
+    numbers = {}
+    return [numbers.setdefault(find(node), len(numbers))
+            for node in range(count)]
+
+
+def radial_layout(count, edges, root=0, spacing=150):
+    """Return the (x, y) position of each node of a tree
+
+    The root is at the centre, each depth on its own ring, and every
+    subtree gets an angle in proportion to its number of leaves.
+    """
+    neighbours = [[] for _ in range(count)]
+    for i, j, _ in edges:
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+    order = [root]
+    parents = {root: None}
+    for node in order:
+        for neighbour in neighbours[node]:
+            if neighbour not in parents:
+                parents[neighbour] = node
+                order.append(neighbour)
+    children = dict((node, []) for node in order)
+    for node in order[1:]:
+        children[parents[node]].append(node)
+    leaves = {}
+    for node in reversed(order):
+        leaves[node] = sum(leaves[child] for child in children[node]) or 1
+
+    positions = [(0.0, 0.0)] * count
+    wedges = {root: (0.0, 2 * math.pi, 0)}
+    for node in order:
+        start, width, depth = wedges[node]
+        angle = start + width / 2
+        positions[node] = (depth * spacing * math.cos(angle),
+                           depth * spacing * math.sin(angle))
+        for child in children[node]:
+            share = width * leaves[child] / leaves[node]
+            wedges[child] = (start, share, depth + 1)
+            start += share
+    return positions
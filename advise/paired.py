@@ -0,0 +1,173 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Compare two groups of systems on demand.
+
+advise-process only writes a Paired_Comparisons file for every pair of
+groups with --eager. Otherwise the differences of any two groups are
+rendered from ``<output_dir>/data/fingerprints.json`` when asked for.
+With --archive, the reports written by advise-process --archive are read
+from the archive instead.
+"""
+
+import argparse
+import json
+import sys
+import zipfile
+
+from advise import postprocess
+from advise import regroup
+
+
+class SavedGroups:
+    """Groups of the checks saved in fingerprints.json"""
+
+    def __init__(self, output_dir):
+        self.data = regroup.load(regroup.fingerprints_path(output_dir))
+        self.checks = self.data["checks"]
+        self.names = self.data["names"]
+
+    def groups(self, number):
+        return regroup.check_groups(self.data, number)
+
+    def report(self, number, A, B, name_A, name_B):
+        return postprocess.pair_report(A, B, name_A, name_B)
+
+
+class ArchivedGroups:
+    """Groups of the checks and their reports in a comparison archive"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path)
+        self.checks = []
+        self.names = {}
+        self._directories = []
+        self._groups = []
+        for path in self.archive.namelist():
+            directory, _, basename = path.rpartition("/")
+            if basename != "groups.json":
+                continue
+            index = json.loads(self.archive.read(path))
+            self.checks.append({"title": index["title"],
+                                "item": index["item"] or ""})
+            self._directories.append(directory)
+            groups = {}
+            for group in index["groups"]:
+                groups[group["fingerprint"]] = [
+                    member["serial"] for member in group["members"]]
+                for member in group["members"]:
+                    self.names[member["serial"]] = member["name"]
+            self._groups.append(groups)
+
+    def groups(self, number):
+        return self._groups[number]
+
+    def report(self, number, A, B, name_A, name_B):
+        return self.archive.read(postprocess.archive_member(
+            self._directories[number], A, B)).decode("utf-8")
+
+
+def find_check(checks, name):
+    """Return the numbers of the checks whose title, or else item, is name"""
+    name = name.lower()
+    titles = [number for number, check in enumerate(checks)
+              if name in (check["title"].lower(),
+                          check["title"].replace(" ", "_").lower())]
+    return titles or [number for number, check in enumerate(checks)
+                      if name == check["item"].lower()]
+
+
+def find_group(groups, names, host):
+    for fingerprint, members in groups.items():
+        for member in members:
+            if host in (member, names[member]):
+                return fingerprint
+    return None
+
+
+def group_name(members, names):
+    return "_".join(names[member] for member in members)
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Show the differences between two groups of systems "
+                    "analysed by advise-process")
+    parser.add_argument(
+        '--output_dir',
+        help="output directory of advise-process")
+    parser.add_argument(
+        '--archive',
+        help="read the reports from this Paired_Comparisons.zip instead")
+    parser.add_argument(
+        '-c',
+        '--check',
+        help="hardware check to compare, e.g 'System' or 'firmware'. "
+             "Without it, the checks are listed")
+    parser.add_argument(
+        'hosts',
+        nargs='*',
+        metavar='host',
+        help="name or serial of a system of each group. Without them, the "
+             "groups of the check are listed")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.archive:
+        source = ArchivedGroups(args.archive)
+    elif args.output_dir:
+        source = SavedGroups(args.output_dir)
+    else:
+        sys.exit("Error: --output_dir or --archive is needed")
+    names = source.names
+    if args.check is None:
+        for number, check in enumerate(source.checks):
+            print("%s (%s): %d groups" % (check["title"], check["item"],
+                                          len(source.groups(number))))
+        return
+    numbers = find_check(source.checks, args.check)
+    if not numbers:
+        sys.exit("Error: unknown check %s" % args.check)
+    if len(numbers) > 1:
+        sys.exit("Error: %s is one of %s" % (
+            args.check, ", ".join(source.checks[number]["title"]
+                                  for number in numbers)))
+    number = numbers[0]
+    groups = source.groups(number)
+    if not args.hosts:
+        for group_number, members in enumerate(groups.values()):
+            print("Group %d: %s" % (group_number,
+                                    ", ".join(names[member]
+                                              for member in members)))
+        return
+    if len(args.hosts) != 2:
+        sys.exit("Error: two hosts are needed, one of each group")
+    pair = [find_group(groups, names, host) for host in args.hosts]
+    for host, fingerprint in zip(args.hosts, pair):
+        if fingerprint is None:
+            sys.exit("Error: unknown host %s" % host)
+    if pair[0] == pair[1]:
+        sys.exit("Error: %s and %s are in the same group" % tuple(args.hosts))
+    print(source.report(number, pair[0], pair[1],
+                        group_name(groups[pair[0]], names),
+                        group_name(groups[pair[1]], names)), end="")
@@ -0,0 +1,161 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Benchmark results of the whole fleet in long format.
+
+Every tuple whose key names a benchmark metric becomes a row of typed
+columns: node, category, device (the sub element), metric (the key) and
+value as float64. Strings are stored as codes into a single dictionary.
+The rows of a node are contiguous, so the rows of a group of hosts are
+gathered without scanning the whole table.
+"""
+
+import array
+import re
+
+import numpy
+from pandas import DataFrame
+from pandas import Index
+
+from advise import utils
+
+BENCHMARK_METRICS = re.compile("simultaneous|standalone|bogomips|"
+                               "loops_per_sec|bandwidth|requests_per_sec")
+
+
+def _object_array(items):
+    objects = numpy.empty(len(items), dtype=object)
+    objects[:] = items
+    return objects
+
+
+class PerfTable:
+    """Long format table of the benchmark results
+
+    Args:
+      bench_values: utils.FleetIndex or list of systems
+      unique_id (str): key identifying the systems
+    """
+
+    def __init__(self, bench_values, unique_id):
+        if not isinstance(bench_values, utils.FleetIndex):
+            bench_values = utils.FleetIndex(bench_values)
+        self.fleet_index = bench_values
+        self.unique_id = unique_id
+        _, self.by_id = bench_values.ids(unique_id)
+        self.strings = []
+        codes = {}
+        is_metric = {}
+        columns = [array.array("i") for _ in range(3)]
+        values = array.array("d")
+        starts = array.array("q", [0])
+        for bench in bench_values.bench_values:
+            seen = set()
+            for line in bench:
+                key = line[2]
+                if key not in is_metric:
+                    is_metric[key] = (isinstance(key, str) and
+                                      BENCHMARK_METRICS.search(key)
+                                      is not None)
+                line = tuple(line)
+                if not is_metric[key] or line in seen:
+                    continue
+                try:
+                    value = float(line[3])
+                except (TypeError, ValueError):
+                    continue
+                seen.add(line)
+                for column, text in zip(columns, line):
+                    code = codes.get(text)
+                    if code is None:
+                        code = codes[text] = len(self.strings)
+                        self.strings.append(text)
+                    column.append(code)
+                values.append(value)
+            starts.append(len(values))
+        self.category, self.device, self.metric = (
+            numpy.frombuffer(column, dtype=numpy.int32) if column
+            else numpy.zeros(0, dtype=numpy.int32) for column in columns)
+        self.value = (numpy.frombuffer(values, dtype=numpy.float64) if values
+                      else numpy.zeros(0))
+        self.starts = numpy.frombuffer(starts, dtype=numpy.int64)
+        self._objects = _object_array(self.strings)
+        self._elements = {}
+
+    def __len__(self):
+        return len(self.value)
+
+    def _element_mask(self, element):
+        # Categories containing element, like find_sub_element()
+        if element not in self._elements:
+            self._elements[element] = numpy.array(
+                [isinstance(text, str) and element in text
+                 for text in self.strings], dtype=bool)
+        return self._elements[element]
+
+    def hosts(self, hosts):
+        """Return the hosts with data and their node, in fleet order
+
+        When several nodes share an id, the last one is used, like
+        search_item() does.
+        """
+        nodes = []
+        for host in hosts:
+            systems = self.by_id.get(host)
+            if systems:
+                nodes.append((systems[0], host, systems[-1]))
+        nodes.sort()
+        return [(host, node) for _, host, node in nodes]
+
+    def rows(self, hosts, element):
+        """Return the rows of some hosts in the categories matching element
+
+        Returns:
+          ``(columns, rows)``, the hosts in fleet order and a DataFrame
+          with host, device, metric and value columns
+        """
+        nodes = self.hosts(hosts)
+        columns = [host for host, _ in nodes]
+        starts = self.starts[[node for _, node in nodes]]
+        counts = self.starts[[node + 1 for _, node in nodes]] - starts
+        index = (numpy.repeat(starts - numpy.cumsum(counts) + counts,
+                              counts) + numpy.arange(counts.sum()))
+        position = numpy.repeat(numpy.arange(len(nodes)), counts)
+        keep = self._element_mask(element)[self.category[index]]
+        index = index[keep]
+        rows = DataFrame({
+            'host': _object_array(columns)[position[keep]],
+            'device': self._objects[self.device[index]],
+            'metric': self._objects[self.metric[index]],
+            'value': self.value[index]})
+        return columns, rows
+
+    def systems(self, hosts, element):
+        """Raw tuples of the hosts, as find_sub_element() returns them"""
+        return self.fleet_index.find_sub_element(self.unique_id, element,
+                                                 hosts)
+
+
+def pivot(rows, hosts, values=None):
+    """Return a devices x hosts DataFrame of long format rows
+
+    Devices are kept in order of first appearance and every host gets a
+    column, NaN where it has no value.
+    """
+    if values is None:
+        values = rows['value']
+    devices = Index(rows['device'].unique())
+    matrix = numpy.full((len(devices), len(hosts)), numpy.nan)
+    matrix[devices.get_indexer(rows['device']),
+           Index(hosts).get_indexer(rows['host'])] = numpy.asarray(values)
+    return DataFrame(matrix, index=devices, columns=hosts)
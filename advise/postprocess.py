@@ -1,5 +1,11 @@
+import contextlib
+import io
+import json
 import os
 import sys
+import zipfile
+
+from advise import tiers
 
 
 def print_T1s(T1s):
@@ -47,85 +53,10 @@ def print_T3s(T3s):
 
 
 def compare_two_groups(A, B, name_A, name_B):
-    shared_T1s = set()
-    shared_T2s = set()
-    shared_T3s = set()
-
-    A_T1s = set()
-    A_T2s = set()
-    A_T3s = set()
-    for item in A:
-        A_T1s.add(item[1])
-        A_T2s.add((item[1], item[2]))
-        A_T3s.add((item[1], item[2], item[3]))
-
-    B_T1s = set()
-    B_T2s = set()
-    B_T3s = set()
-    for item in B:
-        B_T1s.add(item[1])
-        B_T2s.add((item[1], item[2]))
-        B_T3s.add((item[1], item[2], item[3]))
-
-    unique_A_T1s = set()
-    for item in A_T1s:
-        if item not in B_T1s:
-            unique_A_T1s.add(item)
-        else:
-            shared_T1s.add(item)
-
-    unique_A_T2s = set()
-    for item in A_T2s:
-        if item not in B_T2s:
-            unique_A_T2s.add(item)
-        else:
-            shared_T2s.add(item)
-
-    unique_A_T3s = set()
-    for item in A_T3s:
-        if item not in B_T3s:
-            unique_A_T3s.add(item)
-        else:
-            shared_T3s.add(item)
-
-    sub_unique_A_T2s = set()
-    for item in A:
-        if (item[1], item[2]) in unique_A_T2s and item[1] not in unique_A_T1s:
-            sub_unique_A_T2s.add((item[1], item[2]))
-
-    sub_unique_A_T3s = set()
-    for item in A:
-        if ((item[1], item[2], item[3]) in unique_A_T3s
-            and item[1] not in unique_A_T1s
-                and (item[1], item[2]) not in unique_A_T2s):
-            sub_unique_A_T3s.add((item[1], item[2], item[3]))
-
-    unique_B_T1s = set()
-    for item in B_T1s:
-        if item not in A_T1s:
-            unique_B_T1s.add(item)
-
-    unique_B_T2s = set()
-    for item in B_T2s:
-        if item not in A_T2s:
-            unique_B_T2s.add(item)
-
-    unique_B_T3s = set()
-    for item in B_T3s:
-        if item not in A_T3s:
-            unique_B_T3s.add(item)
-
-    sub_unique_B_T2s = set()
-    for item in B:
-        if (item[1], item[2]) in unique_B_T2s and item[1] not in unique_B_T1s:
-            sub_unique_B_T2s.add((item[1], item[2]))
-
-    sub_unique_B_T3s = set()
-    for item in B:
-        if ((item[1], item[2], item[3]) in unique_B_T3s
-            and item[1] not in unique_B_T1s
-                and (item[1], item[2]) not in unique_B_T2s):
-            sub_unique_B_T3s.add((item[1], item[2], item[3]))
+    diff = tiers.engine.diff(A, B)
+    unique_A_T1s, sub_unique_A_T2s, sub_unique_A_T3s = diff.only_a
+    unique_B_T1s, sub_unique_B_T2s, sub_unique_B_T3s = diff.only_b
+    shared_T1s, shared_T2s, shared_T3s = diff.shared
 
     print("Group A:", name_A)
     print("Group B:", name_B)
@@ -201,13 +132,61 @@ def paired_comparison(groups, names_dict, title, global_params):
                              home_name[:50], home_name[:50], away_name[:50]),
                              "w") as f:
                     sys.stdout = f
-                    compare_two_groups(eval(groupA), eval(
-                        groupB), home_name[:-1], away_name[:-1])
+                    compare_two_groups(groupA, groupB, home_name[:-1],
+                                       away_name[:-1])
                     sys.stdout = orig_stdout
 
 
-def process_groups(groups, title, global_params, names_dict):
-    if "output_dir" in global_params.keys() and len(groups) > 1:
+def pair_report(A, B, name_A, name_B):
+    with contextlib.redirect_stdout(io.StringIO()) as f:
+        compare_two_groups(A, B, name_A, name_B)
+    return f.getvalue()
+
+
+def archive_path(output_dir):
+    return "%s/results/Paired_Comparisons.zip" % output_dir
+
+
+def archive_member(directory, A, B):
+    return "%s/%s_vs_%s.txt" % (directory, A, B)
+
+
+def archive_comparison(groups, title, item, global_params, names_dict):
+    """Add the comparisons of every pair of groups to the archive
+
+    The reports are stored under ``<title>/<A>_vs_<B>.txt``, A and B
+    being the digests of the fingerprints, and ``<title>/groups.json``
+    lists the members of each group. The zip central directory indexes
+    them, so a single report is read without scanning the archive.
+    """
+    directory = title.strip().replace(" ", "_")
+    index = {"title": title, "item": item, "groups": []}
+    home_names = {}
+    for group in groups:
+        index["groups"].append({
+            "fingerprint": group.digest,
+            "members": [{"serial": name, "name": names_dict[name]}
+                        for name in groups[group]]})
+        home_names[group] = "_".join(names_dict[name]
+                                     for name in groups[group])
+    with zipfile.ZipFile(archive_path(global_params["output_dir"]), "a",
+                         zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("%s/groups.json" % directory, json.dumps(index))
+        for groupA in groups:
+            for groupB in groups:
+                if groupA != groupB:
+                    archive.writestr(
+                        archive_member(directory, groupA.digest,
+                                       groupB.digest),
+                        pair_report(groupA, groupB, home_names[groupA],
+                                    home_names[groupB]))
+
+
+def process_groups(groups, title, global_params, names_dict, item=None):
+    # Without --eager or --archive, the pairs are compared on demand by
+    # advise-compare from the saved fingerprints
+    if (global_params.get("eager") and "output_dir" in global_params.keys()
+            and len(groups) > 1):
         path = "%s/results/Paired_Comparisons" % (global_params["output_dir"])
         if not os.path.exists(path):
             os.mkdir(path)
@@ -216,3 +195,6 @@ def process_groups(groups, title, global_params, names_dict):
         if not os.path.exists(path):
             os.mkdir(path)
         paired_comparison(groups, names_dict, title, global_params)
+    if (global_params.get("archive") and "output_dir" in global_params.keys()
+            and len(groups) > 1):
+        archive_comparison(groups, title, item, global_params, names_dict)
@@ -0,0 +1,147 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Regroup the systems with a different ignore list.
+
+advise-process saves the fingerprint of every hardware check for every
+system in ``<output_dir>/data/fingerprints.json``. Grouping the systems
+again only needs those fingerprints, so trying another ``-I`` list does
+not read the extra hardware data again. The components of each distinct
+fingerprint are saved too, so advise-compare can show the differences of
+two groups on demand.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from advise import compare_sets
+from advise import utils
+
+VERSION = 2
+
+
+def fingerprints_path(output_dir):
+    return "%s/data/fingerprints.json" % output_dir
+
+
+def save(path, unique_id, hosts, checks, results, names_dict=None):
+    """Save the fingerprints of the hardware checks
+
+    Args:
+      path (str): file to write
+      unique_id (str): key identifying the systems
+      hosts ([str]): systems, in the order they were found
+      checks: ``(item, title)`` of each check
+      results: for each check, its {Fingerprint: [names]} result
+      names_dict (dict): name of each system
+    """
+    names_dict = names_dict or {}
+    fingerprints = dict((host, []) for host in hosts)
+    components = []
+    for result in results:
+        components.append({})
+        for fingerprint, names in result.items():
+            components[-1][fingerprint.digest] = [
+                list(component) for component in fingerprint]
+            for name in names:
+                if name in fingerprints:
+                    fingerprints[name].append(fingerprint.digest)
+    data = {"version": VERSION,
+            "unique_id": unique_id,
+            "checks": [{"item": item, "title": title}
+                       for item, title in checks],
+            "names": dict((host, names_dict.get(host, host))
+                          for host in hosts),
+            "fingerprints": fingerprints,
+            "components": components}
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.mkdir(directory)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != VERSION:
+        raise ValueError("%s: unsupported fingerprints version %s" %
+                         (path, data.get("version")))
+    return data
+
+
+def check_groups(data, number):
+    """Return the {Fingerprint: [hosts]} result of a saved check"""
+    fingerprints = dict(
+        (digest, compare_sets.Fingerprint(tuple(component)
+                                          for component in components))
+        for digest, components in data["components"][number].items())
+    groups = {}
+    for host, digests in data["fingerprints"].items():
+        groups.setdefault(fingerprints[digests[number]], []).append(host)
+    return groups
+
+
+def regroup(data, ignore_list=""):
+    """Return the groups of identical systems, skipping the ignored checks
+
+    A check is ignored when its item is in ``ignore_list``, like the
+    ``-I`` option of advise-process.
+    """
+    enabled = [number for number, check in enumerate(data["checks"])
+               if check["item"] not in ignore_list]
+    combined = {}
+    for host, digests in data["fingerprints"].items():
+        key = tuple(digests[number] for number in enabled)
+        combined.setdefault(key, []).append(host)
+    partition = compare_sets.Partition(data["fingerprints"])
+    partition.refine(combined.values())
+    return partition.groups()
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Group the systems analysed by advise-process again, "
+                    "with a different list of ignored checks")
+    parser.add_argument(
+        '--output_dir',
+        required=True,
+        help="output directory of advise-process")
+    parser.add_argument(
+        '-I',
+        '--ignore',
+        dest="ignore",
+        default="",
+        help="comma separated list of checks to ignore, e.g cpu,disk")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    data = load(fingerprints_path(args.output_dir))
+    ignored = [check["title"] for check in data["checks"]
+               if check["item"] in args.ignore]
+    if ignored:
+        print("Ignoring %s" % ", ".join(ignored))
+    compare_sets.print_systems_groups(regroup(data, args.ignore), {}, None)
+    utils.reporter.flush()
@@ -0,0 +1,110 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Tiered differences between two groups of systems.
+
+The components of a fingerprint are ``(category, element, key, value)``
+tuples. They are compared on three tiers: the elements (T1), the
+``(element, key)`` pairs (T2) and the ``(element, key, value)`` triples
+(T3). A difference is only reported on the highest tier it appears on, so
+a T2 difference is not repeated for a T1 element that is unique already.
+
+The tiers of a fingerprint are built once, and the differences of a pair
+of groups are kept in a bounded LRU cache whichever way round the pair is
+asked for.
+"""
+
+import collections
+import threading
+
+Tiers = collections.namedtuple("Tiers", "t1 t2 t3")
+
+
+class Diff(collections.namedtuple("Diff", "only_a only_b shared")):
+    """Tiers unique to A, unique to B, and shared by both"""
+
+    __slots__ = ()
+
+    def swapped(self):
+        return Diff(self.only_b, self.only_a, self.shared)
+
+
+def build_tiers(components):
+    t1 = set()
+    t2 = set()
+    t3 = set()
+    for item in components:
+        t1.add(item[1])
+        t2.add((item[1], item[2]))
+        t3.add((item[1], item[2], item[3]))
+    return Tiers(frozenset(t1), frozenset(t2), frozenset(t3))
+
+
+def unique_tiers(tiers, other):
+    t1 = tiers.t1 - other.t1
+    t2 = tiers.t2 - other.t2
+    return Tiers(t1,
+                 frozenset(item for item in t2 if item[0] not in t1),
+                 frozenset(item for item in tiers.t3 - other.t3
+                           if item[0] not in t1 and item[:2] not in t2))
+
+
+def diff_tiers(A, B):
+    return Diff(unique_tiers(A, B), unique_tiers(B, A),
+                Tiers(A.t1 & B.t1, A.t2 & B.t2, A.t3 & B.t3))
+
+
+class TierDiff:
+    """Memoized tiered differences of group fingerprints
+
+    Args:
+      maxsize (int): number of pairs of groups kept in the cache
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._tiers = {}
+        self._pairs = collections.OrderedDict()
+        # The dashboard callbacks may run in threads
+        self._lock = threading.Lock()
+
+    def tiers(self, fingerprint):
+        tiers = self._tiers.get(fingerprint)
+        if tiers is None:
+            tiers = self._tiers[fingerprint] = build_tiers(fingerprint)
+        return tiers
+
+    def diff(self, A, B):
+        """Return the Diff of the fingerprints A and B"""
+        with self._lock:
+            if (A, B) in self._pairs:
+                self._pairs.move_to_end((A, B))
+                return self._pairs[(A, B)]
+            if (B, A) in self._pairs:
+                self._pairs.move_to_end((B, A))
+                return self._pairs[(B, A)].swapped()
+        result = diff_tiers(self.tiers(A), self.tiers(B))
+        with self._lock:
+            self._pairs[(A, B)] = result
+            self._pairs.move_to_end((A, B))
+            if len(self._pairs) > self.maxsize:
+                self._pairs.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._tiers.clear()
+            self._pairs.clear()
+
+
+engine = TierDiff()
@@ -13,9 +13,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
+import heapq
+import json
 import math
 import os
 import re
+import sys
 
 class Levels:
     INFO = 1 << 0
@@ -54,14 +58,97 @@ def write_gnuplot_file(filename, index, value):
             gnuplotfile.write('\n'.join(new_lines) + '\n')
 
 
-def do_print(mode, level, string, *args):
+# Report channels, the files are written in <output_dir>/results
+CONSOLE = 'console'
+SUMMARY = '_summary'
+PERFORMANCE = '_performance'
+PERF_SUMMARY = '_perf_summary'
+RESULTS = 'results.jsonl'
+CHANNELS = (CONSOLE, SUMMARY, PERFORMANCE, PERF_SUMMARY, RESULTS)
+
+
+class Reporter:
+    """Buffered writer of the reports
+
+    Messages are kept in memory and written by flush(), the console
+    channel to sys.stdout and the other ones appended to their file.
+    Without an output directory, only the console is written and the
+    performance report goes there.
+    """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        # Channel receiving the console messages, the performance stage
+        # sends them to its report
+        self.console = CONSOLE
+        self.buffers = dict((channel, []) for channel in CHANNELS)
+        self._truncate = set()
+
+    def write(self, text, channels=(CONSOLE,)):
+        for channel in channels:
+            if channel == CONSOLE:
+                channel = self.console
+            self.buffers[channel].append(text)
+
+    def print(self, *args, channels=(CONSOLE,), sep=' ', end='\n'):
+        self.write(sep.join(str(arg) for arg in args) + end, channels)
+
+    def record(self, record):
+        """Add a record to the JSON Lines results"""
+        self.write(json.dumps(record) + '\n', (RESULTS,))
+
+    def truncate(self, channel):
+        """Empty the file of a channel on the next flush"""
+        self.buffers[channel] = []
+        self._truncate.add(channel)
+
+    def take(self):
+        """Return the buffered messages and forget them"""
+        buffers = dict((channel, ''.join(lines))
+                       for channel, lines in self.buffers.items())
+        self.buffers = dict((channel, []) for channel in CHANNELS)
+        return buffers
+
+    def extend(self, buffers):
+        """Append messages taken from another reporter"""
+        for channel, text in buffers.items():
+            if text:
+                self.buffers[channel].append(text)
+
+    def flush(self):
+        buffers = self.take()
+        for channel in CHANNELS:
+            text = buffers[channel]
+            if channel != CONSOLE and not self.output_dir:
+                if channel == PERFORMANCE:
+                    sys.stdout.write(text)
+                continue
+            if channel == CONSOLE:
+                sys.stdout.write(text)
+                continue
+            mode = "a"
+            if channel in self._truncate:
+                self._truncate.discard(channel)
+                mode = "w"
+            elif not text:
+                continue
+            with open("%s/results/%s" % (self.output_dir, channel),
+                      mode) as f:
+                f.write(text)
+        sys.stdout.flush()
+
+
+reporter = Reporter()
+
+
+def do_print(mode, level, string, *args, channels=(CONSOLE,)):
     global PRINTLEVEL
     if level & int(PRINTLEVEL) != level:
         return
     final_string = "%-34s: %-8s: " + string
     final_args = (mode, Levels.message[int(level)])
     final_args += args
-    print(final_string % final_args)
+    reporter.print(final_string % final_args, channels=channels)
 
 def find_names(path, pattern):
     names = []
@@ -100,28 +187,100 @@ def dump_item(output, item, item1, item2, item3):
     return
 
 
-def get_hosts_list(bench_values, unique_id):
-    systems = []
-    for bench in bench_values:
-        for line in bench:
-            dump_item(systems, line, 'system', 'product', unique_id)
+class FleetIndex:
+    """Lines of every system, indexed by top level category
+
+    The index is built in a single pass over the data, afterwards
+    find_sub_element() and get_hosts_list() only touch the lines they
+    return.
+    """
+
+    def __init__(self, bench_values):
+        self.bench_values = bench_values
+        # For each system: category -> lines and their position in the
+        # system, the later is used to keep the original order when
+        # several categories are merged.
+        self.lines = []
+        self.positions = []
+        self.categories = {}
+        for bench in bench_values:
+            lines = collections.defaultdict(list)
+            positions = collections.defaultdict(list)
+            for position, line in enumerate(bench):
+                lines[line[0]].append(line)
+                positions[line[0]].append(position)
+            self.lines.append(dict(lines))
+            self.positions.append(dict(positions))
+            self.categories.update(dict.fromkeys(lines))
+        self._matching = {}
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def matching_categories(self, element):
+        # An element selects all the categories containing it, e.g 'disk'
+        # also matches 'pdisk'
+        if element not in self._matching:
+            self._matching[element] = [category for category in
+                                       self.categories
+                                       if element in category]
+        return self._matching[element]
 
-    return systems
+    def ids(self, unique_id):
+        # Values of ('system', 'product', unique_id) for each system
+        if unique_id not in self._ids:
+            ids = []
+            for lines in self.lines:
+                ids.append([line[3] for line in lines.get('system', ())
+                            if line[1] == 'product' and
+                            line[2] == unique_id])
+            by_id = collections.defaultdict(list)
+            for system, values in enumerate(ids):
+                by_id[values[-1] if values else ''].append(system)
+            self._ids[unique_id] = (ids, dict(by_id))
+        return self._ids[unique_id]
+
+    def get_lines(self, system, element):
+        lines = self.lines[system]
+        categories = [category for category in
+                      self.matching_categories(element)
+                      if category in lines]
+        if not categories:
+            return []
+        if len(categories) == 1:
+            return list(lines[categories[0]])
+        positions = self.positions[system]
+        merged = heapq.merge(*(zip(positions[category], lines[category])
+                               for category in categories))
+        return [line for _, line in merged]
+
+    def get_hosts_list(self, unique_id):
+        ids, _ = self.ids(unique_id)
+        return [value for values in ids for value in values]
+
+    def find_sub_element(self, unique_id, element, hosts=set()):
+        ids, by_id = self.ids(unique_id)
+        if hosts:
+            selected = sorted(system for host in hosts
+                              for system in by_id.get(host, ()))
+        else:
+            selected = range(len(self.lines))
+        systems = []
+        for system in selected:
+            systems.append({unique_id: ids[system][-1] if ids[system] else '',
+                            element: self.get_lines(system, element)})
+        return systems
+
+
+def get_hosts_list(bench_values, unique_id):
+    if not isinstance(bench_values, FleetIndex):
+        bench_values = FleetIndex(bench_values)
+    return bench_values.get_hosts_list(unique_id)
 
 
 # Extract a sub element from the results
 def find_sub_element(bench_values, unique_id, element, hosts=set()):
-    systems = []
-    for bench in bench_values:
-        system = {unique_id: ''}
-        stuff = []
-        for line in bench:
-            get_item(system, line, 'system', 'product', unique_id)
-            if element in line[0]:
-                stuff.append(line)
-
-        if not hosts or system[unique_id] in hosts:
-            system[element] = stuff
-            systems.append(system)
-
-    return systems
+    if not isinstance(bench_values, FleetIndex):
+        bench_values = FleetIndex(bench_values)
+    return bench_values.find_sub_element(unique_id, element, hosts)
@@ -0,0 +1,122 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+"""
+Store of the data shown by advise-visualise.
+
+advise-process saves the data of the Visualiser in the single file
+``<output_dir>/data/vis/store.npz``, one member per section. The series of
+the performance sections are stored as one raw float64 buffer each, with
+their labels as JSON, and the other sections as JSON. numpy reads the
+members only when they are first accessed and never unpickles anything,
+so opening the store is cheap and safe.
+
+The box plots of the performance sections are cached next to it, in
+``<output_dir>/data/vis/figures/<hash>.json``, and the store only lists
+their hashes.
+"""
+
+import json
+import os
+
+import numpy
+from pandas import Index
+from pandas import Series
+
+VERSION = 1
+
+
+def store_path(output_dir):
+    return "%s/data/vis/store.npz" % output_dir
+
+
+def figures_path(output_dir):
+    return "%s/data/vis/figures" % output_dir
+
+
+def _encode_json(value):
+    return numpy.frombuffer(json.dumps(value).encode("utf-8"),
+                            dtype=numpy.uint8)
+
+
+def _encode_series(groups):
+    entries = []
+    values = []
+    offset = 0
+    for group_number, items in groups.items():
+        for title, series in items.items():
+            entries.append({"group": group_number,
+                            "title": title,
+                            "name": series.name,
+                            "index": [str(label) for label in series.index],
+                            "offset": offset})
+            values.append(series.to_numpy(dtype=numpy.float64))
+            offset += len(series)
+    if values:
+        values = numpy.concatenate(values)
+    else:
+        values = numpy.zeros(0)
+    return _encode_json(entries), values
+
+
+def save(path, sections, series_sections):
+    """Save the sections of the Visualiser
+
+    Args:
+      path (str): file to write
+      sections (dict): JSON serialisable sections
+      series_sections (dict): sections of {group: {title: Series}}
+    """
+    arrays = {"version": numpy.array(VERSION)}
+    for name, value in sections.items():
+        arrays[name] = _encode_json(value)
+    for name, groups in series_sections.items():
+        arrays["%s.index" % name], arrays["%s.values" % name] = (
+            _encode_series(groups))
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.mkdir(directory)
+    # Not compressed, the members are read as they are
+    with open(path, "wb") as f:
+        numpy.savez(f, **arrays)
+
+
+class Store:
+    """Sections of a saved store, decoded when first accessed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.arrays = numpy.load(path, allow_pickle=False)
+        version = int(self.arrays["version"])
+        if version != VERSION:
+            raise ValueError("%s: unsupported store version %s" %
+                             (path, version))
+
+    def json(self, name):
+        return json.loads(self.arrays[name].tobytes().decode("utf-8"))
+
+    def series(self, name):
+        """Return the {group: {title: Series}} section name"""
+        values = self.arrays["%s.values" % name]
+        groups = {}
+        # The series of a group usually share their hosts, and an Index
+        # is immutable
+        indexes = {}
+        for entry in self.json("%s.index" % name):
+            labels = tuple(entry["index"])
+            if labels not in indexes:
+                indexes[labels] = Index(labels)
+            offset = entry["offset"]
+            groups.setdefault(entry["group"], {})[entry["title"]] = Series(
+                values[offset:offset + len(labels)].copy(),
+                index=indexes[labels], name=entry["name"])
+        return groups
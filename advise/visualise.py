@@ -1,12 +1,48 @@
 from pyvis.network import Network
-from dash import Dash, html, dcc, dash_table, Input, Output
+from dash import Dash, html, dcc, dash_table, Input, Output, ctx
+from dash import no_update
+import flask
+import plotly
 import plotly.express as px
-import pickle
+import plotly.io
+import plotly.offline
+import pyvis
 import sys
 import os
 import argparse
+import collections
+import concurrent.futures
+import glob
+import hashlib
+from html import escape
+import json
+import math
+import shutil
+import threading
 import pandas as pd
 
+from advise import compare_sets
+from advise import netgraph
+from advise import tiers
+from advise import visstore
+
+
+class Section():
+    """Data of the Visualiser, loaded from its store when first used"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, vis, owner=None):
+        if vis is None:
+            return self
+        if self.name not in vis.__dict__:
+            vis.__dict__[self.name] = vis.load_section(self.name)
+        return vis.__dict__[self.name]
+
+    def __set__(self, vis, value):
+        vis.__dict__[self.name] = value
+
 
 class Visualiser():
     fields = {
@@ -41,57 +77,90 @@ class Visualiser():
             else:
                 self.connections[label].add(target)
 
-    results = {}
-    performance_stats = {}
-    groups = []
+    results = Section()
+    performance_stats = Section()
+    groups = Section()
     output_dir = ""
+    store = None
+    group_of = None
     shared_fields = {"HPA Controller", "HPA Disks", "Megaraid Controller",
                      "Megaraid Disks", "AHCI Controller", "System", "Firmware",
                      "DDR Timing", "Network Interfaces", "Processors"}
-    names_dict = {}
+    names_dict = Section()
     networks = {}
 
-    overperf_groups = {}
-    underperf_groups = {}
-    varperf_groups = {}
-
-    table_data = {}
+    overperf_groups = Section()
+    underperf_groups = Section()
+    varperf_groups = Section()
+    figures = Section()
+
+    perf_sections = (("High Variance", "varperf_groups"),
+                     ("Curious Overperformance", "overperf_groups"),
+                     ("Curious Underperformance", "underperf_groups"))
+
+    table_cache = None
+    table_lock = threading.Lock()
+    table_cache_size = 64
+    table_page_size = 50
+    # Above aggregate_size groups, a field is drawn as a spanning tree of
+    # at most cluster_size nodes
+    aggregate_size = 50
+    cluster_size = 200
+    label_groups = 5
 
     def save_data(self):
-        filepath = "%s/data/vis" % self.output_dir
-        if not os.path.exists("%s/data/vis" % self.output_dir):
-            os.mkdir("%s/data/vis" % self.output_dir)
-        with open("%s/results.pkl" % filepath, "wb") as f:
-            pickle.dump(self.results, f)
-        with open("%s/performance_stats.pkl" % filepath, "wb") as f:
-            pickle.dump(self.performance_stats, f)
-        with open("%s/groups.pkl" % filepath, "wb") as f:
-            pickle.dump(self.groups, f)
-        with open("%s/names_dict.pkl" % filepath, "wb") as f:
-            pickle.dump(self.names_dict, f)
-        with open("%s/overperf_groups.pkl" % filepath, "wb") as f:
-            pickle.dump(self.overperf_groups, f)
-        with open("%s/underperf_groups.pkl" % filepath, "wb") as f:
-            pickle.dump(self.underperf_groups, f)
-        with open("%s/varperf_groups.pkl" % filepath, "wb") as f:
-            pickle.dump(self.varperf_groups, f)
+        results = dict(
+            (title, [{"components": [list(component)
+                                     for component in fingerprint],
+                      "members": list(members)}
+                     for fingerprint, members in result.items()])
+            for title, result in self.results.items())
+        groups = [{"id": group.id,
+                   "title": group.title,
+                   "serials": list(group.serials),
+                   "connections": dict(
+                       (label, sorted(targets))
+                       for label, targets in group.connections.items())}
+                  for group in self.groups]
+        visstore.save(visstore.store_path(self.output_dir),
+                      {"results": results,
+                       "performance_stats": self.performance_stats,
+                       "groups": groups,
+                       "names_dict": self.names_dict,
+                       "figures": self.figures},
+                      {"overperf_groups": self.overperf_groups,
+                       "underperf_groups": self.underperf_groups,
+                       "varperf_groups": self.varperf_groups})
 
     def load_data(self):
-        filepath = "%s/data/vis" % self.output_dir
-        with open("%s/results.pkl" % filepath, "rb") as f:
-            self.results = pickle.load(f)
-        with open("%s/performance_stats.pkl" % filepath, "rb") as f:
-            self.performance_stats = pickle.load(f)
-        with open("%s/groups.pkl" % filepath, "rb") as f:
-            self.groups = pickle.load(f)
-        with open("%s/names_dict.pkl" % filepath, "rb") as f:
-            self.names_dict = pickle.load(f)
-        with open("%s/overperf_groups.pkl" % filepath, "rb") as f:
-            self.overperf_groups = pickle.load(f)
-        with open("%s/underperf_groups.pkl" % filepath, "rb") as f:
-            self.underperf_groups = pickle.load(f)
-        with open("%s/varperf_groups.pkl" % filepath, "rb") as f:
-            self.varperf_groups = pickle.load(f)
+        self.store = visstore.Store(visstore.store_path(self.output_dir))
+
+    def load_section(self, name):
+        if name == "groups":
+            groups = []
+            if self.store is not None:
+                for data in self.store.json(name):
+                    group = Visualiser.Group(data["id"], data["title"],
+                                             data["serials"])
+                    for label, targets in data["connections"].items():
+                        group.connections[label] = set(targets)
+                    groups.append(group)
+            return groups
+        if self.store is None:
+            return {}
+        if name == "results":
+            return dict(
+                (title, dict((compare_sets.Fingerprint(
+                                 tuple(component)
+                                 for component in group["components"]),
+                              group["members"])
+                             for group in result))
+                for title, result in self.store.json(name).items())
+        if name.endswith("perf_groups"):
+            return self.store.series(name)
+        if name == "figures" and name not in self.store.arrays.files:
+            return {}
+        return self.store.json(name)
 
     def add_item_varperf(self, item, group_number, mode, title):
         index = "%s %s" % (mode, title)
@@ -116,6 +185,8 @@ class Visualiser():
 
     def __init__(self, output_dir):
         self.output_dir = output_dir
+        self.network_pages = {}
+        self.table_pairs = {}
 
     def add_result(self, title, result):
         self.results[title] = result
@@ -124,62 +195,87 @@ class Visualiser():
         group = Visualiser.Group(id, title, serials)
         self.groups.append(group)
 
-    def compare_serials(self, group, other_group, systems, label):
-        if (group.id != other_group.id
-                and other_group.serials[0] not in systems):
-            if label in self.shared_fields:
-                self.shared_fields.remove(label)
-            if label not in other_group.connections:
-                if group.id < other_group.id:
-                    group.add_connection(
-                        label, other_group.id)
-                else:
-                    other_group.add_connection(
-                        label, group.id)
-            elif group.id not in other_group.connections[label]:
-                if group.id < other_group.id:
-                    group.add_connection(
-                        label, other_group.id)
-                else:
-                    other_group.add_connection(
-                        label, group.id)
+    def index_groups(self):
+        self.group_of = {}
+        for group in self.groups:
+            for serial in group.serials:
+                self.group_of[serial] = group.id
+        position = dict((group.id, number)
+                        for number, group in enumerate(self.groups))
+        self.fingerprint_groups = {}
+        for field, result in self.results.items():
+            self.fingerprint_groups[field] = {}
+            for element, systems in result.items():
+                ids = set(self.group_of[system] for system in systems
+                          if system in self.group_of)
+                self.fingerprint_groups[field][element] = sorted(
+                    ids, key=position.get)
+
+    def group_ids(self, field, element):
+        """Return the ids of the groups having element for field"""
+        if self.group_of is None:
+            self.index_groups()
+        return self.fingerprint_groups[field][element]
 
     def extract_connections(self):
-        for item in self.results:
-            label = item
-            for group in self.groups:
-                for element in self.results[item]:
-                    if eval(element) == set():
-                        if label in self.shared_fields:
-                            self.shared_fields.remove(label)
-                    systems = self.results[item][element]
-                    if group.serials[0] in systems:
-                        for other_group in self.groups:
-                            self.compare_serials(group, other_group, systems,
-                                                 label)
+        if self.group_of is None:
+            self.index_groups()
+        for label in self.results:
+            if not all(self.results[label]) and self.groups:
+                self.shared_fields.discard(label)
+            elements = {}
+            for element, ids in self.fingerprint_groups[label].items():
+                for id in ids:
+                    elements[id] = element
+            for number, group in enumerate(self.groups):
+                for other_group in self.groups[number + 1:]:
+                    if (elements.get(group.id) is None and
+                            elements.get(other_group.id) is None):
+                        continue
+                    if elements.get(group.id) == elements.get(other_group.id):
+                        continue
+                    self.shared_fields.discard(label)
+                    if group.id < other_group.id:
+                        group.add_connection(label, other_group.id)
+                    else:
+                        other_group.add_connection(label, group.id)
+
+    def subgraph_node(self, item, elements):
+        """Return the label, title and size of a node of elements"""
+        systems = [system for element in elements
+                   for system in self.results[item][element]]
+        group_ids = [str(id) for element in elements
+                     for id in self.group_ids(item, element)]
+        if len(group_ids) == 1:
+            label = "Group %s" % group_ids[0]
+        elif len(group_ids) > self.label_groups:
+            label = "Groups %s, ... (%d groups)" % (
+                ", ".join(group_ids[:self.label_groups]), len(group_ids))
+        else:
+            label = "Groups %s" % ", ".join(group_ids)
+        if len(systems) > 1:
+            label += "\n%s systems" % len(systems)
+        else:
+            label += "\n1 system"
+
+        title = ""
+        for system in systems:
+            title += "%s\n" % self.names_dict[system]
+        return label, title, len(systems)
 
     def generate_subgraph(self, net, item):
-        node_count = 0
+        elements = []
         for element in self.results[item]:
-            if eval(element) == set():
+            if not element:
+                break
+            elements.append(element)
+        else:
+            if len(elements) > self.aggregate_size:
+                self.generate_aggregate(net, item, elements)
                 return
-            systems = self.results[item][element]
-            title = ""
-            group_ids = []
-            for group in self.groups:
-                if group.serials[0] in systems:
-                    group_ids.append(str(group.id))
-            if len(group_ids) == 1:
-                label = "Group %s" % group_ids[0]
-            else:
-                label = "Groups %s" % ", ".join(group_ids)
-            if len(systems) > 1:
-                label += "\n%s systems" % len(systems)
-            else:
-                label += "\n1 system"
 
-            for system in systems:
-                title += "%s\n" % self.names_dict[system]
+        for node_count, element in enumerate(elements):
+            label, title, size = self.subgraph_node(item, [element])
             net.add_node(
                 n_id=node_count,
                 label=label,
@@ -187,9 +283,11 @@ class Visualiser():
                 shape='circle',
                 font_size=10,
                 color='grey',
-                value=len(systems))
-            node_count += 1
+                value=size)
+        if len(elements) < len(self.results[item]):
+            return
 
+        node_count = len(elements)
         for i in range(node_count):
             for j in range(node_count):
                 if i < j:
@@ -208,86 +306,100 @@ class Visualiser():
                         arrows={'to': {'enabled': False}},
                         hoverWidth=0.05)
 
-    def record_networks(self):
-        with open("%s/results/All_result.html" % self.output_dir, "r") as f:
-            self.networks["All"] = f.read()
-        for field in self.fields:
-            if (eval(list(self.results[field].keys())[0]) != set()
-                    and len(self.results[field]) != 1):
-                with open("%s/results/%s_result.html" % (self.output_dir,
-                          field.replace(" ", "_")), "r") as f:
-                    self.networks[field] = f.read()
+    def generate_aggregate(self, net, item, elements):
+        # All the groups differ, so only a spanning tree of the closest
+        # ones is drawn, clustered and laid out here rather than by the
+        # browser
+        weights = netgraph.distances(
+            [tiers.engine.tiers(element).t3 for element in elements])
+        tree = netgraph.spanning_tree(weights)
+        numbers = netgraph.clusters(len(elements), tree, self.cluster_size)
+        members = collections.defaultdict(list)
+        for element, number in zip(elements, numbers):
+            members[number].append(element)
+        edges = {}
+        for i, j, weight in tree:
+            pair = tuple(sorted((numbers[i], numbers[j])))
+            if pair[0] != pair[1]:
+                edges[pair] = min(weight, edges.get(pair, weight))
+        edges = [pair + (weight,) for pair, weight in edges.items()]
+
+        nodes = [self.subgraph_node(item, members[number])
+                 for number in range(len(members))]
+        root = max(range(len(nodes)), key=lambda number: nodes[number][2])
+        positions = netgraph.radial_layout(len(nodes), edges, root)
+        for number, (label, title, size) in enumerate(nodes):
+            x, y = positions[number]
+            net.add_node(
+                n_id=number,
+                label=label,
+                title=title,
+                shape='circle',
+                font_size=10,
+                color='grey',
+                value=size,
+                x=round(x, 1),
+                y=round(y, 1),
+                physics=False)
+        for i, j, weight in edges:
+            net.add_edge(
+                source=i,
+                to=j,
+                width=3,
+                label="%d" % weight,
+                title="%s: %d differences" % (item, weight),
+                physics=False,
+                color=self.fields[item][0],
+                smooth=False,
+                font={'size': 9, 'align': 'middle'},
+                arrows={'to': {'enabled': False}},
+                hoverWidth=0.05)
+
+    def network_fields(self):
+        """Return the fields shown with a network, after All"""
+        return [field for field in self.fields
+                if (list(self.results[field].keys())[0]
+                    and len(self.results[field]) != 1)]
+
+    def record_networks(self, app):
+        # The networks are served as separate pages, sharing the
+        # vis-network script
+        for field in ["All"] + self.network_fields():
+            self.networks[field] = app.get_relative_path(
+                "/networks/%s" % field.replace(" ", "_"))
+
+    def network_html(self, field):
+        if field not in self.network_pages:
+            if field == "All":
+                net = self.all_network()
+            else:
+                net = self.field_network(field)
+            self.network_pages[field] = NETWORK_PAGE % network_page(net)
+        return self.network_pages[field]
+
+    def serve_networks(self, app):
+        fields = dict((field.replace(" ", "_"), field)
+                      for field in self.networks)
+        vis_lib = vis_network_lib()
+
+        @app.server.route("/networks/<name>")
+        def network(name):
+            if name not in fields:
+                flask.abort(404)
+            response = flask.make_response(self.network_html(fields[name]))
+            response.cache_control.public = True
+            response.cache_control.max_age = 3600
+            response.add_etag()
+            return response.make_conditional(flask.request)
+
+        @app.server.route("/networks/assets/<path:name>")
+        def network_assets(name):
+            return flask.send_from_directory(vis_lib, name, max_age=86400)
 
     def compare_two_groups(self, A, B):
-        A_T1s = set()
-        A_T2s = set()
-        A_T3s = set()
-        for item in A:
-            A_T1s.add(item[1])
-            A_T2s.add((item[1], item[2]))
-            A_T3s.add((item[1], item[2], item[3]))
-
-        B_T1s = set()
-        B_T2s = set()
-        B_T3s = set()
-        for item in B:
-            B_T1s.add(item[1])
-            B_T2s.add((item[1], item[2]))
-            B_T3s.add((item[1], item[2], item[3]))
-
-        unique_A_T1s = set()
-        for item in A_T1s:
-            if item not in B_T1s:
-                unique_A_T1s.add(item)
-
-        unique_A_T2s = set()
-        for item in A_T2s:
-            if item not in B_T2s:
-                unique_A_T2s.add(item)
-
-        unique_A_T3s = set()
-        for item in A_T3s:
-            if item not in B_T3s:
-                unique_A_T3s.add(item)
-
-        sub_unique_A_T2s = set()
-        for item in A:
-            if (item[1], item[2]) in unique_A_T2s and item[1] not in unique_A_T1s:
-                sub_unique_A_T2s.add((item[1], item[2]))
-
-        sub_unique_A_T3s = set()
-        for item in A:
-            if ((item[1], item[2], item[3]) in unique_A_T3s
-                and item[1] not in unique_A_T1s
-                    and (item[1], item[2]) not in unique_A_T2s):
-                sub_unique_A_T3s.add((item[1], item[2], item[3]))
-
-        unique_B_T1s = set()
-        for item in B_T1s:
-            if item not in A_T1s:
-                unique_B_T1s.add(item)
-
-        unique_B_T2s = set()
-        for item in B_T2s:
-            if item not in A_T2s:
-                unique_B_T2s.add(item)
-
-        unique_B_T3s = set()
-        for item in B_T3s:
-            if item not in A_T3s:
-                unique_B_T3s.add(item)
-
-        sub_unique_B_T2s = set()
-        for item in B:
-            if (item[1], item[2]) in unique_B_T2s and item[1] not in unique_B_T1s:
-                sub_unique_B_T2s.add((item[1], item[2]))
-
-        sub_unique_B_T3s = set()
-        for item in B:
-            if ((item[1], item[2], item[3]) in unique_B_T3s
-                and item[1] not in unique_B_T1s
-                    and (item[1], item[2]) not in unique_B_T2s):
-                sub_unique_B_T3s.add((item[1], item[2], item[3]))
+        diff = tiers.engine.diff(A, B)
+        unique_A_T1s, sub_unique_A_T2s, sub_unique_A_T3s = diff.only_a
+        unique_B_T1s, sub_unique_B_T2s, sub_unique_B_T3s = diff.only_b
 
         A_diffs = {"A_T1": [], "A_T2": [], "A_T3": []}
         for item in sorted(unique_A_T1s):
@@ -324,44 +436,61 @@ class Visualiser():
 
         return (pd.DataFrame(data=A_diffs), pd.DataFrame(data=B_diffs))
 
-    def generate_table_data(self):
+    def generate_table_pairs(self):
+        # Only the pairs are listed, their tables are computed when they
+        # are first shown
         for field in self.fields:
-            if eval(list(self.results[field].keys())[0]) != set():
+            if list(self.results[field].keys())[0]:
                 groups = self.results[field]
-                self.table_data[field] = {}
+                self.table_pairs[field] = {}
                 for groupA in groups:
-                    group_ids = []
-                    for group in self.groups:
-                        if group.serials[0] in groups[groupA]:
-                            group_ids.append(str(group.id))
-                    if len(group_ids) == 1:
-                        name_A = group_ids[0]
-                    else:
-                        name_A = "_".join(group_ids)
+                    name_A = "_".join(str(id) for id in
+                                      self.group_ids(field, groupA))
                     for groupB in groups:
                         if groups[groupA] != groups[groupB]:
-                            group_ids = []
-                            for group in self.groups:
-                                if group.serials[0] in groups[groupB]:
-                                    group_ids.append(str(group.id))
-                            if len(group_ids) == 1:
-                                name_B = group_ids[0]
-                            else:
-                                name_B = "_".join(group_ids)
-                            if "%s vs %s" % (name_B, name_A) not in self.table_data[field].keys():
-                                diffs = self.compare_two_groups(eval(groupA),
-                                                                eval(groupB))
-                                self.table_data[field]["%s vs %s"
-                                                    % (name_A, name_B)] = diffs
+                            name_B = "_".join(str(id) for id in
+                                              self.group_ids(field, groupB))
+                            if "%s vs %s" % (name_B, name_A) not in self.table_pairs[field].keys():
+                                self.table_pairs[field]["%s vs %s"
+                                                        % (name_A, name_B)] = (
+                                    groupA, groupB)
+
+    def pair_tables(self, field, pair):
+        """Return the tables of unique values of a pair of groups"""
+        # The callbacks of the development server run in threads
+        key = (field, pair)
+        with self.table_lock:
+            if self.table_cache is None:
+                self.table_cache = collections.OrderedDict()
+            if key in self.table_cache:
+                self.table_cache.move_to_end(key)
+                return self.table_cache[key]
+        tables = self.compare_two_groups(*self.table_pairs[field][pair])
+        with self.table_lock:
+            self.table_cache[key] = tables
+            self.table_cache.move_to_end(key)
+            if len(self.table_cache) > self.table_cache_size:
+                self.table_cache.popitem(last=False)
+        return tables
+
+    def table_page(self, table, page_current, page_size):
+        start = page_current * page_size
+        return (table.iloc[start:start + page_size].to_dict('records'),
+                max(1, math.ceil(len(table) / page_size)))
+
+    def field_network(self, field):
+        net = Network(directed=True, width="1200px", height="600px")
 
-    def separate_networks(self):
-        for field in self.fields:
-            if eval(list(self.results[field].keys())[0]) != set():
-                net = Network(directed=True, width="1200px", height="600px")
+        self.generate_subgraph(net, field)
 
-                self.generate_subgraph(net, field)
+        net.toggle_physics(False)
+        return net
 
-                net.toggle_physics(False)
+    def separate_networks(self):
+        for field in self.fields:
+            if list(self.results[field].keys())[0]:
+                net = self.field_network(field)
+                self.network_pages[field] = NETWORK_PAGE % network_page(net)
                 try:
                     net.write_html("%s/results/%s_result.html" %
                              (self.output_dir, field.replace(" ", "_")))
@@ -369,6 +498,14 @@ class Visualiser():
                     print(e)
 
     def combined_network(self):
+        net = self.all_network()
+        self.network_pages["All"] = NETWORK_PAGE % network_page(net)
+        try:
+            net.write_html("%s/results/All_result.html" % self.output_dir)
+        except Exception as e:
+            print(e)
+
+    def all_network(self):
         net = Network(directed=True, width="1200px", height="600px")
 
         self.extract_connections()
@@ -413,19 +550,77 @@ class Visualiser():
                     count += 1
 
         net.toggle_physics(False)
-        try:
-            net.write_html("%s/results/All_result.html" % self.output_dir)
-        except Exception as e:
-            print(e)
+        return net
 
     def visualise_hardware(self):
+        # The pages served by the dashboard are kept as they are written,
+        # before the gunicorn workers are forked
         self.combined_network()
         self.separate_networks()
 
+    def perf_items(self, section):
+        for group_number, element in getattr(self, section).items():
+            for title in element:
+                yield group_number, title, element[title]
+
+    def box_figure(self, group_number, title, data):
+        data = data.rename(index=self.names_dict)
+        return px.box(data.round(2), title="Group %s %s" % (
+            group_number, title), orientation='h',
+            hover_data=[data.index])
+
+    def figure_key(self, group_number, title, data):
+        labels = [str(self.names_dict.get(label, label))
+                  for label in data.index]
+        digest = hashlib.sha256(json.dumps(
+            [plotly.__version__, str(group_number), title, str(data.name),
+             labels]).encode("utf-8"))
+        digest.update(data.to_numpy(dtype="float64").tobytes())
+        return digest.hexdigest()[:32]
+
+    def save_figures(self):
+        """Write the box plots missing from the figure cache
+
+        The figures are keyed by a hash of their data, so those of an
+        unchanged run are only built once.
+        """
+        directory = visstore.figures_path(self.output_dir)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.figures = {}
+        for _, section in self.perf_sections:
+            keys = self.figures[section] = []
+            for group_number, title, data in self.perf_items(section):
+                key = self.figure_key(group_number, title, data)
+                path = "%s/%s.json" % (directory, key)
+                if not os.path.exists(path):
+                    figure = self.box_figure(group_number, title, data)
+                    # Replaced at once, other processes may be reading it
+                    with open("%s.%d" % (path, os.getpid()), "w") as f:
+                        f.write(figure.to_json())
+                    os.replace("%s.%d" % (path, os.getpid()), path)
+                keys.append(key)
+        used = set(key for keys in self.figures.values() for key in keys)
+        for name in os.listdir(directory):
+            if name.endswith(".json") and name[:-len(".json")] not in used:
+                os.remove("%s/%s" % (directory, name))
+
+    def figure_keys(self, section):
+        # Stores saved before the figure cache have none
+        if not self.figures:
+            self.save_figures()
+        return self.figures[section]
+
+    def load_figure(self, key):
+        with open("%s/%s.json" % (visstore.figures_path(self.output_dir),
+                                  key)) as f:
+            return json.load(f)
+
     def visualise_performance(self):
         app = Dash(__name__)
 
-        self.record_networks()
+        self.record_networks(app)
+        self.serve_networks(app)
 
         output = [html.H1(children='ADVise Hardware Differences'),
                   html.H2(children='Groups')]
@@ -440,22 +635,32 @@ class Visualiser():
             group_names.append(html.Br())
         output.append(html.P(group_names))
 
+        # Only the All network is loaded with the page, the others when
+        # they are first opened
         for field in self.networks:
             output.append(html.H2(field))
-            output.append(
-                html.Div(html.Iframe(
+            output.append(html.Details([
+                html.Summary("Network", id='%s-summary' % field),
+                html.Iframe(
                     id='network_graph_%s' % field,
-                    srcDoc=self.networks[field],
-                    style={"height": "650px", "width": "100%"})))
+                    src=self.networks[field] if field == "All" else None,
+                    style={"height": "650px", "width": "100%"})],
+                open=field == "All"))
             if field != "All":
-                groupings = list(self.table_data[field].keys())
+                groupings = list(self.table_pairs[field].keys())
                 output.append(dcc.Dropdown(groupings, groupings[0], id="%s-dropdown" % field, style={"width" : "50%"}))
                 output.append(html.Div([
                     html.Div([
                         html.P("Group %s has unique values:" % groupings[0].split()[0], id="%s-text-A" % field),
                         dash_table.DataTable(
-                            self.table_data[field][groupings[0]][0].to_dict('records'),
+                            [],
+                            [{"name": column, "id": column} for column in
+                             ("A_T1", "A_T2", "A_T3")],
                             id='%s-table-A' % field,
+                            page_action='custom',
+                            page_current=0,
+                            page_size=self.table_page_size,
+                            page_count=1,
                             style_data={
                                 'whiteSpace': 'normal',
                                 'height': 'auto'
@@ -470,8 +675,14 @@ class Visualiser():
                     html.Div([
                         html.P("Group %s has unique values:" % groupings[0].split()[2], id="%s-text-B" % field),
                         dash_table.DataTable(
-                            self.table_data[field][groupings[0]][1].to_dict('records'),
+                            [],
+                            [{"name": column, "id": column} for column in
+                             ("B_T1", "B_T2", "B_T3")],
                             id='%s-table-B' % field,
+                            page_action='custom',
+                            page_current=0,
+                            page_size=self.table_page_size,
+                            page_count=1,
                             style_data={
                                 'whiteSpace': 'normal',
                                 'height': 'auto'
@@ -502,103 +713,315 @@ class Visualiser():
             ])),
         ])
 
-        i = 0
-        output.append(html.H2(children='High Variance'))
-        for group_number in self.varperf_groups:
-            element = self.varperf_groups[group_number]
-            for title in element:
-                data = element[title]
-                new_index = {}
-                for serial in data.index:
-                    if serial in self.names_dict:
-                        new_index[serial] = self.names_dict[serial]
-                data.rename(index=new_index, inplace=True)
-                fig = px.box(data.round(2), title="Group %s %s" % (
-                    group_number, title), orientation='h',
-                    hover_data=[data.index])
-                output.append(dcc.Graph(
-                    id='example-graph-%s' % i,
-                    figure=fig
-                ))
-                i += 1
-
-        output.append(html.H2(children='Curious Overperformance'))
-        for group_number in self.overperf_groups:
-            element = self.overperf_groups[group_number]
-            for title in element:
-                data = element[title]
-                new_index = {}
-                for serial in data.index:
-                    if serial in self.names_dict:
-                        new_index[serial] = self.names_dict[serial]
-                data.rename(index=new_index, inplace=True)
-                fig = px.box(data.round(2), title="Group %s %s" % (
-                    group_number, title), orientation='h',
-                    hover_data=[data.index])
-                output.append(dcc.Graph(
-                    id='example-graph-%s' % i,
-                    figure=fig
-                ))
-                i += 1
-
-        output.append(html.H2(children='Curious Underperformance'))
-        for group_number in self.underperf_groups:
-            element = self.underperf_groups[group_number]
-            for title in element:
-                data = element[title]
-                new_index = {}
-                for serial in data.index:
-                    if serial in self.names_dict:
-                        new_index[serial] = self.names_dict[serial]
-                data.rename(index=new_index, inplace=True)
-                fig = px.box(data.round(2), title="Group %s %s" % (
-                    group_number, title), orientation='h',
-                    hover_data=[data.index])
-                output.append(dcc.Graph(
-                    id='example-graph-%s' % i,
-                    figure=fig
-                ))
-                i += 1
+        # The box plots of a section are only loaded when it is opened
+        for heading, section in self.perf_sections:
+            output.append(html.H2(children=heading))
+            output.append(html.Details([
+                html.Summary("%d box plots" % len(self.figure_keys(section)),
+                             id='%s-summary' % section),
+                html.Div(id='%s-figures' % section)]))
 
         app.layout = html.Div(children=output)
 
-        def make_callback_A(field):
+        def make_callback(field):
+            # Both tables are filled by one callback, a page at a time
             @app.callback(
-                [Output('%s-table-A' % field, 'data'), Output('%s-text-A' % field, 'children')],
-                Input('%s-dropdown' % field, 'value')
+                [Output('%s-table-A' % field, 'data'),
+                 Output('%s-table-A' % field, 'page_count'),
+                 Output('%s-table-A' % field, 'page_current'),
+                 Output('%s-text-A' % field, 'children'),
+                 Output('%s-table-B' % field, 'data'),
+                 Output('%s-table-B' % field, 'page_count'),
+                 Output('%s-table-B' % field, 'page_current'),
+                 Output('%s-text-B' % field, 'children')],
+                [Input('%s-dropdown' % field, 'value'),
+                 Input('%s-table-A' % field, 'page_current'),
+                 Input('%s-table-A' % field, 'page_size'),
+                 Input('%s-table-B' % field, 'page_current'),
+                 Input('%s-table-B' % field, 'page_size')]
             )
-            def update_output(value):
-                if value != None:
-                    text = "Group %s has unique values:" % value.split()[0]
-                    return self.table_data[field][value][0].to_dict('records'), text
-                else:
-                    return None, ""
+            def update_output(value, page_A, size_A, page_B, size_B):
+                if value is None:
+                    return None, 1, 0, "", None, 1, 0, ""
+                if ctx.triggered_id == '%s-dropdown' % field:
+                    page_A = page_B = 0
+                table_A, table_B = self.pair_tables(field, value)
+                data_A, count_A = self.table_page(table_A, page_A, size_A)
+                data_B, count_B = self.table_page(table_B, page_B, size_B)
+                return (data_A, count_A, page_A,
+                        "Group %s has unique values:" % value.split()[0],
+                        data_B, count_B, page_B,
+                        "Group %s has unique values:" % value.split()[2])
             return update_output
-        
-        def make_callback_B(field):
+
+        def make_network_callback(field):
             @app.callback(
-                [Output('%s-table-B' % field, 'data'), Output('%s-text-B' % field, 'children')],
-                Input('%s-dropdown' % field, 'value')
+                Output('network_graph_%s' % field, 'src'),
+                Input('%s-summary' % field, 'n_clicks'),
+                prevent_initial_call=True
             )
-            def update_output(value):
-                if value != None:
-                    text = "Group %s has unique values:" % value.split()[2]
-                    return self.table_data[field][value][1].to_dict('records'), text
-                else:
-                    return None, ""
-            return update_output
-        
+            def load_network(n_clicks):
+                return self.networks[field]
+            return load_network
+
+        def make_figures_callback(section, start):
+            @app.callback(
+                Output('%s-figures' % section, 'children'),
+                Input('%s-summary' % section, 'n_clicks'),
+                prevent_initial_call=True
+            )
+            def load_figures(n_clicks):
+                if n_clicks > 1:
+                    return no_update
+                return [dcc.Graph(id='example-graph-%s' % (start + i),
+                                  figure=self.load_figure(key))
+                        for i, key in enumerate(self.figure_keys(section))]
+            return load_figures
+
         for field in self.networks:
             if field != "All":
-                make_callback_A(field)
-                make_callback_B(field)
+                make_callback(field)
+                make_network_callback(field)
+
+        start = 0
+        for _, section in self.perf_sections:
+            make_figures_callback(section, start)
+            start += len(self.figure_keys(section))
 
-        app.run_server(debug=True)
+        return app
 
-    def visualise(self):
-        self.generate_table_data()
+    def visualise(self, host="127.0.0.1", port=8050, workers=0):
+        self.generate_table_pairs()
         self.visualise_hardware()
-        self.visualise_performance()
+        app = self.visualise_performance()
+        if workers:
+            serve(app.server, host, port, workers)
+        else:
+            app.run(host=host, port=port, debug=True)
+
+    def static_pages(self):
+        pages = [("index", ""), ("network", "All")]
+        for field in self.network_fields():
+            pages.extend((("network", field), ("tables", field)))
+        pages.extend(("performance", heading)
+                     for heading, _ in self.perf_sections)
+        return pages
+
+    def write_page(self, directory, page):
+        kind, name = page
+        head = ""
+        if kind == "index":
+            title = "ADVise"
+            body = self.index_page()
+        elif kind == "network":
+            title = "%s network" % name
+            head = ('<link rel="stylesheet" href="assets/vis-network.css">\n'
+                    '<script src="assets/vis-network.min.js"></script>')
+            if name == "All":
+                net = self.all_network()
+            else:
+                net = self.field_network(name)
+            body = network_page(net)
+        elif kind == "tables":
+            title = "%s differences" % name
+            body = self.tables_page(name)
+        else:
+            title = name
+            head = '<script src="assets/plotly.min.js"></script>'
+            section = dict(self.perf_sections)[name]
+            body = "\n".join(
+                plotly.io.to_html(self.load_figure(key), full_html=False,
+                                  include_plotlyjs=False)
+                for key in self.figure_keys(section))
+        with open("%s/%s" % (directory, page_file(page)), "w") as f:
+            f.write(STATIC_PAGE % {"title": escape(title),
+                                   "head": head, "body": body})
+
+    def index_page(self):
+        groups = []
+        for group in self.groups:
+            groups.append("<b>Group %s: </b>%s<br>" % (
+                group.id, escape(", ".join(
+                    self.names_dict[serial] for serial in group.serials))))
+        links = []
+        for page in self.static_pages()[1:]:
+            kind, name = page
+            if kind == "performance":
+                text = name
+            else:
+                text = "%s %s" % (name, "network" if kind == "network"
+                                  else "differences")
+            links.append('<li><a href="%s">%s</a></li>' % (
+                page_file(page), escape(text)))
+        return "<h2>Groups</h2>\n<p>%s</p>\n<ul>\n%s\n</ul>" % (
+            "\n".join(groups), "\n".join(links))
+
+    def tables_page(self, field):
+        if field not in self.table_pairs:
+            self.generate_table_pairs()
+        body = []
+        for pair in self.table_pairs[field]:
+            table_A, table_B = self.pair_tables(field, pair)
+            body.append(
+                '<h2>Groups %s</h2>\n<div class="pair">\n'
+                '<div><p>Group %s has unique values:</p>\n%s</div>\n'
+                '<div><p>Group %s has unique values:</p>\n%s</div>\n'
+                '</div>' % (escape(pair),
+                            escape(pair.split()[0]),
+                            table_A.to_html(index=False, header=False),
+                            escape(pair.split()[2]),
+                            table_B.to_html(index=False, header=False)))
+        return "\n".join(body)
+
+    def export_static(self, directory, jobs=None):
+        """Write the results as static HTML pages in directory
+
+        The pages are rendered by a pool of processes, and share the
+        scripts and style sheets of the assets directory.
+        """
+        if not os.path.exists("%s/assets" % directory):
+            os.makedirs("%s/assets" % directory)
+        vis_lib = vis_network_lib()
+        shutil.copy("%s/vis-network.min.js" % vis_lib,
+                    "%s/assets" % directory)
+        shutil.copy("%s/vis-network.css" % vis_lib, "%s/assets" % directory)
+        with open("%s/assets/plotly.min.js" % directory, "w") as f:
+            f.write(plotly.offline.get_plotlyjs())
+        with open("%s/assets/advise.css" % directory, "w") as f:
+            f.write(STATIC_STYLE)
+
+        pages = self.static_pages()
+        if jobs == 1:
+            for page in pages:
+                self.write_page(directory, page)
+            return
+        with concurrent.futures.ProcessPoolExecutor(
+                min(jobs or os.cpu_count(), len(pages)),
+                initializer=init_export_worker,
+                initargs=(self.output_dir, directory)) as executor:
+            list(executor.map(export_page, pages))
+
+
+STATIC_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<link rel="stylesheet" href="assets/advise.css">
+%(head)s
+</head>
+<body>
+<p><a href="index.html">ADVise</a></p>
+<h1>%(title)s</h1>
+%(body)s
+</body>
+</html>
+"""
+
+STATIC_STYLE = """body { font-family: sans-serif; }
+.pair { display: flex; }
+.pair > div { width: 50%; }
+table { border-collapse: collapse; }
+td { border: 1px solid #ccc; padding: 2px 6px; text-align: left; }
+#network { width: 1200px; height: 600px; border: 1px solid #ccc; }
+"""
+
+
+def page_file(page):
+    kind, name = page
+    if kind == "index":
+        return "index.html"
+    return "%s_%s.html" % (kind, name.replace(" ", "_"))
+
+
+NETWORK_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="assets/vis-network.css">
+<script src="assets/vis-network.min.js"></script>
+<style>#network { width: 1200px; height: 600px; }</style>
+</head>
+<body>
+%s
+</body>
+</html>
+"""
+
+
+def vis_network_lib():
+    """Return the directory of the newest vis-network bundled with pyvis"""
+    def version(path):
+        return tuple(int(part) if part.isdigit() else 0
+                     for part in path.rpartition("vis-")[2].split("."))
+    libs = [os.path.dirname(path) for path in glob.glob(
+        "%s/lib/vis-*/vis-network.min.js" % os.path.dirname(pyvis.__file__))]
+    if not libs:
+        raise FileNotFoundError("vis-network is not bundled with pyvis %s" %
+                                pyvis.__version__)
+    return max(libs, key=version)
+
+
+def network_page(net):
+    nodes, edges, _, _, _, options = net.get_network_data()
+    # </ must not end the script element
+    data = json.dumps({"nodes": nodes, "edges": edges}).replace("</", "<\\/")
+    return ('<div id="network"></div>\n<script>\n'
+            'var data = %s;\n'
+            'new vis.Network(document.getElementById("network"), '
+            '{nodes: new vis.DataSet(data.nodes), '
+            'edges: new vis.DataSet(data.edges)}, %s);\n'
+            '</script>' % (data, options))
+
+
+# Visualiser of the export workers
+export_worker = {}
+
+
+def init_export_worker(output_dir, directory):
+    vis = Visualiser(output_dir)
+    vis.load_data()
+    export_worker.update(vis=vis, directory=directory)
+
+
+def export_page(page):
+    export_worker["vis"].write_page(export_worker["directory"], page)
+
+
+def create_app(output_dir):
+    """Return the WSGI application of the dashboard of output_dir
+
+    e.g ``gunicorn -w 4 'advise.visualise:create_app("output_dir")'``
+    """
+    vis = Visualiser(output_dir)
+    vis.load_data()
+    vis.generate_table_pairs()
+    vis.visualise_hardware()
+    return vis.visualise_performance().server
+
+
+def serve(server, host, port, workers):
+    """Serve a WSGI application with gunicorn workers
+
+    The data is loaded before the workers are forked, so they all share
+    it.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("Error: --workers needs gunicorn, "
+                 "e.g pip install 'ADVise[serve]'")
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", "%s:%s" % (host, port))
+            self.cfg.set("workers", workers)
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return server
+
+    Application().run()
 
 
 def parse_args(args):
@@ -614,6 +1037,32 @@ def parse_args(args):
         description="")
     parser.add_argument(
         '--output_dir')
+    parser.add_argument(
+        '--host',
+        default="127.0.0.1",
+        help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8050,
+        help="port to listen on (default: 8050)")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help="serve the dashboard with this many gunicorn workers, without "
+             "debugging. By default, the Dash development server is used")
+    parser.add_argument(
+        '--export-static',
+        metavar='DIR',
+        help="write the results as static HTML pages in DIR instead of "
+             "serving the dashboard")
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        help="number of processes rendering the static pages "
+             "(default: number of CPUs)")
     return parser.parse_args(args)
 
 
@@ -623,4 +1072,7 @@ def main():
     vis = Visualiser(args.output_dir)
     vis.load_data()
 
-    vis.visualise()
+    if args.export_static:
+        vis.export_static(args.export_static, args.jobs)
+    else:
+        vis.visualise(args.host, args.port, args.workers)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Scaling of utils.find_sub_element with the number of groups
+
+For each group count, the fleet is split in that many groups and the
+lookups done by advise.compare_performance (4 per group) are timed, once
+with the linear scan used before utils.FleetIndex and once with the index.
+
+Usage: python benchmarks/bench_index.py [--nodes 2000] [--lines 1000]
+"""
+
+import argparse
+import random
+import time
+
+from advise import utils
+
+
+def linear_find_sub_element(bench_values, unique_id, element, hosts=set()):
+    systems = []
+    for bench in bench_values:
+        system = {unique_id: ''}
+        stuff = []
+        for line in bench:
+            utils.get_item(system, line, 'system', 'product', unique_id)
+            if element in line[0]:
+                stuff.append(line)
+
+        if not hosts or system[unique_id] in hosts:
+            system[element] = stuff
+            systems.append(system)
+
+    return systems
+
+
+def synthetic_fleet(nodes, lines):
+    rand = random.Random(0)
+    categories = ['cpu', 'disk', 'pdisk', 'memory', 'network', 'ipmi',
+                  'firmware', 'hpa', 'megaraid', 'ahci']
+    fleet = []
+    for i in range(nodes):
+        bench = [('system', 'product', 'serial', 'SER%06d' % i)]
+        for j in range(lines):
+            bench.append((rand.choice(categories), 'sub%d' % (j % 64),
+                          'key%d' % j, str(rand.random())))
+        fleet.append(sorted(bench))
+    return fleet
+
+
+def lookups(bench_values, groups):
+    for group in groups:
+        for element in ('disk', 'cpu', 'cpu', 'network'):
+            utils.find_sub_element(bench_values, 'serial', element, group)
+
+
+def linear_lookups(bench_values, groups):
+    for group in groups:
+        for element in ('disk', 'cpu', 'cpu', 'network'):
+            linear_find_sub_element(bench_values, 'serial', element, group)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=2000)
+    parser.add_argument('--lines', type=int, default=1000)
+    args = parser.parse_args()
+
+    fleet = synthetic_fleet(args.nodes, args.lines)
+    serials = ['SER%06d' % i for i in range(args.nodes)]
+
+    start = time.perf_counter()
+    index = utils.FleetIndex(fleet)
+    print("%d nodes of %d lines, index built in %.3f s" %
+          (args.nodes, args.lines, time.perf_counter() - start))
+    print("%8s %12s %12s" % ("groups", "linear (s)", "index (s)"))
+    for group_count in (1, 10, 50, 200):
+        groups = [set(serials[i::group_count]) for i in range(group_count)]
+        start = time.perf_counter()
+        linear_lookups(fleet, groups)
+        linear = time.perf_counter() - start
+        start = time.perf_counter()
+        lookups(index, groups)
+        indexed = time.perf_counter() - start
+        print("%8d %12.3f %12.3f" % (group_count, linear, indexed))
+
+
+if __name__ == '__main__':
+    main()
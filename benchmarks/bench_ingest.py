@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare advise.ingest against eval and ast.literal_eval
+
+Usage: python benchmarks/bench_ingest.py [--lines 10000] [--files 20]
+"""
+
+import argparse
+import ast
+import os
+import random
+import tempfile
+import time
+
+from advise import ingest
+
+
+def synthetic_node(lines, seed):
+    rand = random.Random(seed)
+    items = [('system', 'product', 'serial', 'SER%08d' % seed)]
+    while len(items) < lines:
+        category = rand.choice(['cpu', 'disk', 'memory', 'network', 'ipmi',
+                                'firmware', 'system'])
+        sub = rand.choice(['logical_%d' % rand.randint(0, 127), 'sda',
+                           'bank:%d' % rand.randint(0, 31), 'eth0', 'lan'])
+        key = rand.choice(['bogomips', 'loops_per_sec', 'product', 'size',
+                           'standalone_read_1M_KBps', 'flags', 'vendor'])
+        value = rand.choice([
+            str(rand.random() * 10000),
+            rand.randint(0, 1 << 40),
+            rand.random(),
+            "Intel(R) Xeon(R) CPU E5-2650 0 @ 2.00GHz",
+            "fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca",
+            "it's \"quoted\"",
+            None,
+            True])
+        items.append((category, sub, key, value))
+    return repr(sorted(items, key=repr))
+
+
+def timed(func, paths):
+    start = time.perf_counter()
+    result = [func(path) for path in paths]
+    return time.perf_counter() - start, result
+
+
+def with_eval(path):
+    with open(path) as f:
+        return eval(f.read())
+
+
+def with_literal_eval(path):
+    with open(path) as f:
+        return ast.literal_eval(f.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--files', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, 'node-%04d.eval' % i)
+            with open(path, 'w') as f:
+                f.write(synthetic_node(args.lines, i))
+            paths.append(path)
+
+        reference = None
+        print("%d files of %d lines" % (args.files, args.lines))
+        for name, func in (('eval', with_eval),
+                           ('ast.literal_eval', with_literal_eval),
+                           ('advise.ingest.load', ingest.load)):
+            elapsed, result = timed(func, paths)
+            if reference is None:
+                reference = result
+            elif result != reference:
+                raise SystemExit("%s returned different data" % name)
+            print("%-20s: %8.3f s total, %8.2f ms per file" %
+                  (name, elapsed, elapsed * 1000 / len(paths)))
+
+
+if __name__ == '__main__':
+    main()
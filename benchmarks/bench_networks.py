@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Rendering time and size of the network of a field with many groups
+
+A synthetic fleet is split in groups which all differ in their Firmware,
+some only slightly, and the page of the Firmware network is rendered
+once drawing every pair of groups and once as an aggregated graph.
+
+Usage: python benchmarks/bench_networks.py [--nodes 8000] [--groups 1000]
+"""
+
+import argparse
+import random
+import time
+
+from advise import visualise
+from advise.visualise import Visualiser
+from synthetic import synthetic_visualiser
+
+FIELD = "Firmware"
+
+
+def firmware_components(rand):
+    def components(title, number):
+        if title != FIELD:
+            return [('system', 'product', 'name', 'server')]
+        # A few families of versions, each group changing some
+        components = [('firmware', 'bios', 'version', '1.%d' % (number % 8))]
+        components += [('firmware', 'device_%d' % j, 'version',
+                        '%d.%d' % (j, rand.randrange(3)))
+                       for j in range(12)]
+        components.append(('firmware', 'bmc', 'build', str(number)))
+        return components
+    return components
+
+
+def render(vis):
+    start = time.perf_counter()
+    net = vis.field_network(FIELD)
+    page = visualise.NETWORK_PAGE % visualise.network_page(net)
+    return (time.perf_counter() - start, len(net.nodes), len(net.edges),
+            len(page))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=8000)
+    parser.add_argument('--groups', type=int, default=1000)
+    args = parser.parse_args()
+
+    vis = synthetic_visualiser("", args.nodes, args.groups,
+                               firmware_components(random.Random(0)))
+    print("%d nodes in %d groups" % (args.nodes, args.groups))
+    for name, size in (("every pair", args.groups), ("aggregated", 50)):
+        Visualiser.aggregate_size = size
+        elapsed, nodes, edges, length = render(vis)
+        print("%-12s %8.2f s %6d nodes %8d edges %8.1f MB" %
+              (name, elapsed, nodes, edges, length / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Micro-benchmark of check.search_item rule matching
+
+Runs the rule sets of the hardware and performance checks over a synthetic
+fleet with the loop based matching used before check.Rule and with the
+compiled rules, and checks both select the same tuples.
+
+Usage: python benchmarks/bench_search_item.py [--nodes 4000]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from advise import check
+
+RULES = [
+    ("disk", r"(\d+)I:(\d+):(\d+)",
+     ['current_temperature_(c)', 'maximum_temperature_(c)',
+      'serial_number'], [], []),
+    ("disk", r"[a-z]d(\S+)|nvme.*|logical",
+     ['simultaneous', 'standalone', 'id', 'serial_number', 'SMART/'], [],
+     ['when_failed', 'vendor', 'product', 'health']),
+    ("disk", r"[a-z]d(\S+)|nvme.*|logical", [],
+     ['simultaneous', 'standalone'], []),
+    ("cpu", "(.*)", ['bogomips', 'loops_per_sec', 'bandwidth', 'cache_size',
+                     '/temperature'], [], []),
+    ("cpu", "(.*)", [], ['bogomips', 'loops_per_sec'], []),
+    ("cpu", "(.*)", [], ['1K', '4K', '1M', '16M', '128M', '256M', '1G', '2G'],
+     []),
+]
+
+
+def loop_search_item(system_list, unique_id, item, regexp, exclude_list=[],
+                     include_list=[], override_list=[]):
+    sets = {}
+    for system in system_list:
+        sets[system[unique_id]] = set()
+        current_set = sets[system[unique_id]]
+        for stuff in system[item]:
+            match = re.match(regexp, stuff[1])
+            if match:
+                shall_be_added = False
+                if include_list:
+                    shall_be_excluded = True
+                else:
+                    shall_be_excluded = False
+                for include in include_list:
+                    if include in stuff[2]:
+                        shall_be_excluded = False
+                for exclude in exclude_list:
+                    if exclude in stuff[2]:
+                        shall_be_excluded = True
+                for override in override_list:
+                    if override in stuff[2]:
+                        shall_be_added = True
+                if (shall_be_excluded is False) or (shall_be_added is True):
+                    current_set.add(tuple(stuff))
+    return sets
+
+
+def synthetic_systems(nodes):
+    rand = random.Random(0)
+    disk_keys = ['size', 'vendor', 'model', 'rev', 'id', 'serial_number',
+                 'SMART/when_failed', 'SMART/health', 'scsi-id',
+                 'standalone_read_1M_KBps', 'standalone_randread_4k_IOps',
+                 'simultaneous_read_1M_KBps', 'current_temperature_(c)']
+    cpu_keys = ['bogomips', 'loops_per_sec', 'bandwidth_1G',
+                'threaded_bandwidth_1M', 'product', 'vendor', 'cache_size',
+                'flags', 'frequency', 'cores', 'threads']
+    systems = []
+    for i in range(nodes):
+        disk = [('disk', sub, key, str(rand.random()))
+                for sub in ('sda', 'sdb', 'nvme0n1', '1I:1:1', 'logical')
+                for key in disk_keys]
+        cpu = [('cpu', 'logical_%d' % core, key, str(rand.random()))
+               for core in range(32) for key in cpu_keys]
+        systems.append({'serial': 'SER%06d' % i, 'disk': disk, 'cpu': cpu})
+    return systems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=4000)
+    args = parser.parse_args()
+
+    systems = synthetic_systems(args.nodes)
+    print("%d nodes" % args.nodes)
+    print("%-30s %10s %10s %8s" % ("rule", "loop (s)", "rule (s)", "speedup"))
+    for item, regexp, exclude, include, override in RULES:
+        start = time.perf_counter()
+        expected = loop_search_item(systems, 'serial', item, regexp, exclude,
+                                    include, override)
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        result = check.search_item(systems, 'serial', item, regexp, exclude,
+                                   include, override)
+        compiled = time.perf_counter() - start
+        if result != expected:
+            raise SystemExit("Different selection for %s %s" % (item, regexp))
+        print("%-30s %10.3f %10.3f %7.1fx" % (
+            ("%s %s" % (item, regexp))[:30], loop, compiled, loop / compiled))
+
+
+if __name__ == '__main__':
+    main()
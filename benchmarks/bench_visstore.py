@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Loading time of the Visualiser data
+
+A synthetic fleet is split in groups, each with flagged performance
+series, and the data of the Visualiser is saved and loaded once with the
+pickle files used before advise.visstore and once with the store.
+
+Usage: python benchmarks/bench_visstore.py [--nodes 4000] [--groups 400]
+"""
+
+import argparse
+import os
+import pickle
+import random
+import tempfile
+import time
+
+from pandas import Series
+
+from advise.visualise import Visualiser
+from synthetic import synthetic_visualiser
+
+SECTIONS = ("results", "performance_stats", "groups", "names_dict",
+            "overperf_groups", "underperf_groups", "varperf_groups")
+
+
+def cpu_components(title, number):
+    return [('cpu', 'logical_%d' % j, 'key%d' % k,
+             '%s-%d' % (title, number % 50))
+            for j in range(4) for k in range(20)]
+
+
+def flagged_visualiser(output_dir, nodes, group_count):
+    rand = random.Random(0)
+    vis = synthetic_visualiser(output_dir, nodes, group_count,
+                               cpu_components)
+    for group in vis.groups:
+        for metric in range(20):
+            item = Series([rand.random() for _ in group.serials],
+                          index=group.serials, name='logical_%d' % metric,
+                          dtype=float)
+            vis.add_item_varperf(item, group.id, 'loops_per_sec',
+                                 item.name)
+            vis.add_item_overperf(item, group.id, 'bogomips', item.name)
+    return vis
+
+
+def pickle_save(vis):
+    for section in SECTIONS:
+        with open("%s/%s.pkl" % (vis.output_dir, section), "wb") as f:
+            pickle.dump(getattr(vis, section), f)
+
+
+def pickle_load(output_dir):
+    data = {}
+    for section in SECTIONS:
+        with open("%s/%s.pkl" % (output_dir, section), "rb") as f:
+            data[section] = pickle.load(f)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=4000)
+    parser.add_argument('--groups', type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.mkdir("%s/data" % output_dir)
+        vis = flagged_visualiser(output_dir, args.nodes, args.groups)
+        pickle_save(vis)
+        vis.save_data()
+
+        start = time.perf_counter()
+        pickle_load(output_dir)
+        pickled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = Visualiser(output_dir)
+        loaded.load_data()
+        opened = time.perf_counter() - start
+        for section in SECTIONS:
+            getattr(loaded, section)
+        stored = time.perf_counter() - start
+
+    print("%d nodes in %d groups" % (args.nodes, args.groups))
+    print("%-28s %8.3f s" % ("pickle, every section", pickled))
+    print("%-28s %8.3f s" % ("store, open", opened))
+    print("%-28s %8.3f s" % ("store, every section", stored))
+
+
+if __name__ == '__main__':
+    main()
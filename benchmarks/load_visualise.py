@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Load test of a running advise-visualise dashboard
+
+Concurrent clients load the page like a browser does (index, layout and
+dependencies), then ask for the difference tables of every field, and
+the latency of the requests is reported.
+
+Start the dashboard first, e.g:
+
+  advise-visualise --output_dir out --workers 4 --port 8050
+  python benchmarks/load_visualise.py --url http://127.0.0.1:8050 \\
+      --clients 12 --rounds 10
+"""
+
+import argparse
+import concurrent.futures
+import json
+import time
+import urllib.request
+
+
+def fetch(url, payload=None):
+    data = None
+    headers = {}
+    if payload is not None:
+        data = json.dumps(payload).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(url, data=data, headers=headers)
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def find_values(component, values):
+    # Values of the dropdowns of the layout, by id
+    if isinstance(component, list):
+        for child in component:
+            find_values(child, values)
+    elif isinstance(component, dict):
+        props = component.get("props", {})
+        if str(props.get("id", "")).endswith("-dropdown"):
+            values[props["id"]] = props.get("value")
+        find_values(props.get("children"), values)
+
+
+def table_requests(layout, dependencies):
+    values = {}
+    find_values(layout, values)
+    payloads = []
+    for callback in dependencies:
+        inputs = callback["inputs"]
+        if not inputs or inputs[0]["id"] not in values:
+            continue
+        outputs = [dict(zip(("id", "property"), output.split(".")))
+                   for output in callback["output"].strip(".").split("...")]
+        payloads.append({
+            "output": callback["output"],
+            "outputs": outputs,
+            "inputs": [dict(entry, value=values[entry["id"]])
+                       if entry["property"] == "value"
+                       else dict(entry, value=50 if entry["property"] ==
+                                 "page_size" else 0)
+                       for entry in inputs],
+            "changedPropIds": ["%s.value" % inputs[0]["id"]]})
+    return payloads
+
+
+def client(url, payloads, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+            start = time.perf_counter()
+            fetch(url + path)
+            latencies.append(time.perf_counter() - start)
+        for payload in payloads:
+            start = time.perf_counter()
+            fetch(url + "/_dash-update-component", payload)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default="http://127.0.0.1:8050")
+    parser.add_argument('--clients', type=int, default=12)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    layout = json.loads(fetch(args.url + "/_dash-layout"))
+    dependencies = json.loads(fetch(args.url + "/_dash-dependencies"))
+    payloads = table_requests(layout, dependencies)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(args.clients) as executor:
+        futures = [executor.submit(client, args.url, payloads, args.rounds)
+                   for _ in range(args.clients)]
+        latencies = sorted(latency for future in futures
+                           for latency in future.result())
+    elapsed = time.perf_counter() - start
+
+    print("%d clients, %d requests in %.2f s, %.1f requests/s" %
+          (args.clients, len(latencies), elapsed, len(latencies) / elapsed))
+    for percentile in (50, 90, 99):
+        index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+        print("p%d latency %8.1f ms" % (percentile, 1000 * latencies[index]))
+
+
+if __name__ == '__main__':
+    main()
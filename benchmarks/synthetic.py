@@ -0,0 +1,41 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Synthetic fleets shared by the benchmarks of the Visualiser"""
+
+from advise import compare_sets
+from advise.visualise import Visualiser
+
+
+def synthetic_visualiser(output_dir, nodes, group_count, components):
+    """Return a Visualiser of nodes systems striped over group_count groups
+
+    Args:
+      components (callable): components(title, number) returns the
+        components of the fingerprint of the group number for the field
+        title, groups with the same components are merged
+    """
+    vis = Visualiser(output_dir)
+    serials = ['SER%06d' % i for i in range(nodes)]
+    vis.names_dict = dict((serial, 'node-%06d' % i)
+                          for i, serial in enumerate(serials))
+    groups = [serials[i::group_count] for i in range(group_count)]
+    for title in Visualiser.fields:
+        result = {}
+        for number, group in enumerate(groups):
+            result.setdefault(compare_sets.Fingerprint(
+                components(title, number)), []).extend(group)
+        vis.add_result(title, result)
+    for number, group in enumerate(groups):
+        vis.add_group(number, "Group %d" % number, group)
+    return vis